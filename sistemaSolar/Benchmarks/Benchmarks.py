@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from sistemaSolar.GLApp.Camera.Camera import Camera
+from sistemaSolar.GLApp.Camera.Character import Character
+from sistemaSolar.GLApp.Mesh.Light.ObjTextureMesh import load_mesh
+from sistemaSolar.GLApp.Transformations.Orbits import planet_transform, satellite_transform
+from sistemaSolar.GLApp.Transformations.Transformations import identity_mat, translate, scale, rotate, \
+    translate_mat, scale_mat, rotate_x_mat, rotate_y_mat, rotate_z_mat
+
+# Micro-benchmarks de las rutas de CPU que se ejecutan al cargar y en cada frame. Ninguno necesita
+# contexto de OpenGL: solo se mide la parte de calculo de cada funcion
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'models')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Como la escena: 9 cuerpos alrededor del sol con 0 a 6 satelites cada uno
+BODIES = [(1.053 * (i + 1) ** 1.5, 0.24 * (i + 1) ** 2, 0.005 * (i + 1), min(i, 6)) for i in range(9)]
+
+
+def bench_load_star_destroyer():
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_mesh(os.path.join(MODELS_DIR, 'starDestroyer.obj'))
+
+
+def bench_load_nave():
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_mesh(os.path.join(MODELS_DIR, 'nave.obj'))
+
+
+def bench_matrix_builders():
+    translate_mat(1.0, 2.0, 3.0)
+    scale_mat(0.5, 0.5, 0.5)
+    rotate_x_mat(30)
+    rotate_y_mat(45)
+    rotate_z_mat(60)
+
+
+def bench_transform_chain():
+    transformation = identity_mat()
+    transformation = translate(transformation, 1.0, 2.0, 3.0)
+    transformation = rotate(transformation, 45, 'y')
+    transformation = rotate(transformation, 10, 'x', False)
+    scale(transformation, 0.5, 0.5, 0.5)
+
+
+def bench_orbits_frame():
+    # Todas las transformaciones de un frame de display()/draw_satellite()
+    for orbit_radius, orbital_speed, scale_factor, satellites in BODIES:
+        transformation = planet_transform(orbit_radius, orbital_speed, 0.01, 45.0, scale_factor)
+        for s in range(satellites):
+            satellite_transform(transformation, 0.1 * (s + 1), 0.1 * (s + 1), 12345, 0, 0.002)
+
+
+def make_camera():
+    camera = Camera.__new__(Camera)
+    camera.transformation = identity_mat()
+    return camera
+
+
+def make_character():
+    character = Character.__new__(Character)
+    character.transformation = identity_mat()
+    character.scale = 0.005
+    return character
+
+
+def bench_camera_rotate(camera=make_camera()):
+    camera.rotate(0.3, -0.2)
+    camera.rotate(-0.3, 0.2)
+
+
+def bench_character_place(character=make_character()):
+    # update_position() sin el dibujo; se reinicia la matriz acumulada para no degenerar en inf
+    character.transformation = identity_mat()
+    character.place(translate(identity_mat(), 0.1, 0.2, 0.3))
+
+
+BENCHMARKS = {
+    "load_mesh/starDestroyer.obj": bench_load_star_destroyer,
+    "load_mesh/nave.obj": bench_load_nave,
+    "transformations/builders": bench_matrix_builders,
+    "transformations/chain": bench_transform_chain,
+    "orbits/frame": bench_orbits_frame,
+    "camera/rotate": bench_camera_rotate,
+    "character/update_position": bench_character_place,
+}
+
+
+def measure(function, repeats=5, min_time=0.1):
+    # Se calibra el numero de llamadas para que cada repeticion dure al menos min_time segundos
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) / number)
+    return {"min_s": min(samples), "median_s": statistics.median(samples), "number": number, "repeats": repeats}
+
+
+def run(selected=None, repeats=5, min_time=0.1):
+    results = {}
+    for name, function in BENCHMARKS.items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        results[name] = measure(function, repeats, min_time)
+        print(f'{name:30s} {results[name]["min_s"] * 1e6:12.2f} us  (median {results[name]["median_s"] * 1e6:.2f} us)')
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Se compara el minimo de cada benchmark, menos sensible al ruido que la media
+    regressions = []
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            print(f'{name:30s} new benchmark, no baseline')
+            continue
+        before = baseline["benchmarks"][name]["min_s"]
+        change = result["min_s"] / before - 1
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f'{name:30s} {before * 1e6:12.2f} us -> {result["min_s"] * 1e6:12.2f} us  {change:+7.1%}  {status}')
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPU micro-benchmarks for the solar system")
+    parser.add_argument("command", choices=["run", "save", "compare"],
+                        help="run: print results; save: store them as the baseline; "
+                             "compare: fail if any benchmark is slower than the baseline by more than --threshold")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--results", help="compare this results file instead of running the benchmarks")
+    parser.add_argument("--output", help="also write the results of this run to a JSON file")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%")
+    parser.add_argument("--filter", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="minimum seconds per repeat")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare" and not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run "save" first to record one')
+        return 1
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run(args.filter, args.repeats, args.min_time)
+    for path in filter(None, [args.output, args.baseline if args.command == "save" else None]):
+        with open(path, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f'Results written to {path}')
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: {", ".join(regressions)}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import os
+import time
 
 import pygame
 from OpenGL.GL import *
@@ -8,19 +9,25 @@ from sistemaSolar.GLApp.Camera.Camera import Camera
 
 
 class BaseScene:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, hidden=False, msaa_samples=4):
         os.environ["SDL_VIDEO_CENTERED"] = '1'
         pygame.init()
         info = pygame.display.Info()
         display = [info.current_w, info.current_h]
 
-        # antialiasing
-        pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLEBUFFERS, 1)
-        pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLESAMPLES, 4)
+        # antialiasing; las escenas que renderizan en su propio framebuffer piden msaa_samples=0
+        if msaa_samples > 0:
+            pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLEBUFFERS, 1)
+            pygame.display.gl_set_attribute(pygame.GL_MULTISAMPLESAMPLES, msaa_samples)
         pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
-        self.screen = pygame.display.set_mode(display, DOUBLEBUF | OPENGL | pygame.RESIZABLE)
+        flags = DOUBLEBUF | OPENGL | pygame.RESIZABLE
+        if hidden:
+            flags |= pygame.HIDDEN
+        self.screen = pygame.display.set_mode(display, flags)
         pygame.display.set_caption("PyOpenGLApp")
         self.camera = None
+        self.resolution = None
+        self.last_frame_ms = 0.0
 
     def initialize(self):
         pass
@@ -31,21 +38,53 @@ class BaseScene:
     def camera_init(self):
         pass
 
+    def resize(self, width, height):
+        if self.camera is not None:
+            self.camera.set_viewport_size(width, height)
+        if self.resolution is not None:
+            self.resolution.resize(width, height)
+        else:
+            glViewport(0, 0, width, height)
+
+    def finish(self):
+        pass
+
+    def reset_simulation(self):
+        pass
+
+    def draw_frame(self):
+        # Todo el trabajo del frame salvo el intercambio de buffers, que espera al vsync
+        self.camera_init()
+        if self.resolution is not None:
+            self.resolution.begin_frame()
+        self.display()
+        if self.resolution is not None:
+            self.resolution.end_frame()
+
+    def render_frame(self):
+        self.draw_frame()
+        pygame.display.flip()
+
     def main_loop(self):
         self.initialize()
         pygame.event.set_grab(True)
         pygame.mouse.set_visible(False)
         run = True
+        last_frame = time.perf_counter()
         while run:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     run = False
+                if event.type == pygame.VIDEORESIZE:
+                    self.resize(event.w, event.h)
 
-            self.camera_init()
-            self.display()
-            pygame.display.flip()
+            self.render_frame()
+            now = time.perf_counter()
+            self.last_frame_ms = (now - last_frame) * 1000
+            last_frame = now
+        self.finish()
         pygame.quit()
 
     @staticmethod
@@ -0,0 +1,141 @@
+from collections import deque
+
+from OpenGL.GL import *
+
+from sistemaSolar.GLApp.Utils.GpuTimer import GpuTimer
+
+
+class DynamicResolution:
+    # Renderiza la escena en un framebuffer propio cuya escala de resolucion y nivel de MSAA se
+    # ajustan para mantener un tiempo de frame objetivo, y luego lo escala a la ventana. Se mide el
+    # tiempo de GPU del render (GpuTimer), no el intervalo entre frames: este incluye la espera
+    # del vsync en flip() y nunca bajaria de ~16.7 ms
+    def __init__(self, window_width, window_height, target_frame_ms, min_scale=0.5, max_scale=1.0,
+                 msaa_levels=(4, 2, 0), scale_step=0.1, cooldown_frames=30):
+        self.window_width = window_width
+        self.window_height = window_height
+        self.target_frame_ms = target_frame_ms
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        max_samples = glGetIntegerv(GL_MAX_SAMPLES)
+        self.msaa_levels = sorted({min(level, max_samples) for level in msaa_levels}, reverse=True)
+        self.scale_step = scale_step
+        self.cooldown_frames = cooldown_frames
+        self.scale = max_scale
+        self.msaa_index = 0
+        # Mediana de una ventana de muestras: un tiron aislado (subida de texturas) no cambia nada
+        self.frame_samples = deque(maxlen=cooldown_frames)
+        self.adaptive = True
+        self.timer = GpuTimer("Scene render", report_every=None)
+        self.frames_since_change = 0
+        self.width = 0
+        self.height = 0
+        self.fbo = None
+        self.resolve_fbo = None
+        self.renderbuffers = []
+        self.create_framebuffers()
+
+    @property
+    def samples(self):
+        return self.msaa_levels[self.msaa_index]
+
+    def create_framebuffers(self):
+        self.delete_framebuffers()
+        self.width = max(1, int(self.window_width * self.scale))
+        self.height = max(1, int(self.window_height * self.scale))
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        color, depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, color)
+        glRenderbufferStorageMultisample(GL_RENDERBUFFER, self.samples, GL_RGBA8, self.width, self.height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+        glBindRenderbuffer(GL_RENDERBUFFER, depth)
+        glRenderbufferStorageMultisample(GL_RENDERBUFFER, self.samples, GL_DEPTH_COMPONENT24, self.width, self.height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+        self.renderbuffers = [color, depth]
+        if self.samples > 0:
+            # Un framebuffer multimuestra no se puede escalar al copiarlo: primero se resuelve
+            self.resolve_fbo = glGenFramebuffers(1)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.resolve_fbo)
+            resolved = glGenRenderbuffers(1)
+            glBindRenderbuffer(GL_RENDERBUFFER, resolved)
+            glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, self.width, self.height)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, resolved)
+            self.renderbuffers.append(resolved)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        print(f'Render resolution {self.width}x{self.height} ({self.scale:.2f}x), MSAA {self.samples}x')
+
+    def delete_framebuffers(self):
+        if self.renderbuffers:
+            glDeleteRenderbuffers(len(self.renderbuffers), self.renderbuffers)
+            self.renderbuffers = []
+        for fbo in (self.fbo, self.resolve_fbo):
+            if fbo is not None:
+                glDeleteFramebuffers(1, [fbo])
+        self.fbo = None
+        self.resolve_fbo = None
+
+    def resize(self, window_width, window_height):
+        self.window_width = window_width
+        self.window_height = window_height
+        self.create_framebuffers()
+
+    def begin_frame(self):
+        self.timer.begin()
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+
+    def end_frame(self):
+        source = self.fbo
+        if self.resolve_fbo is not None:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.resolve_fbo)
+            glBlitFramebuffer(0, 0, self.width, self.height, 0, 0, self.width, self.height,
+                              GL_COLOR_BUFFER_BIT, GL_NEAREST)
+            source = self.resolve_fbo
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, source)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        glBlitFramebuffer(0, 0, self.width, self.height, 0, 0, self.window_width, self.window_height,
+                          GL_COLOR_BUFFER_BIT, GL_LINEAR)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        render_ms = self.timer.end()
+        if render_ms is not None and self.adaptive:
+            self.frame_finished(render_ms)
+
+    def frame_finished(self, frame_ms):
+        self.frames_since_change += 1
+        # Las consultas en vuelo al cambiar todavia miden la configuracion anterior
+        if self.frames_since_change <= self.timer.latency:
+            return
+        self.frame_samples.append(frame_ms)
+        if len(self.frame_samples) < self.frame_samples.maxlen:
+            return
+        median_ms = sorted(self.frame_samples)[len(self.frame_samples) // 2]
+        if median_ms > self.target_frame_ms * 1.1:
+            self.degrade()
+        elif median_ms < self.target_frame_ms * 0.75:
+            self.improve()
+
+    def degrade(self):
+        # Primero se quita MSAA, que es lo mas caro en rasterizado por software, luego resolucion
+        if self.msaa_index < len(self.msaa_levels) - 1:
+            self.msaa_index += 1
+        elif self.scale > self.min_scale:
+            self.scale = max(self.min_scale, self.scale - self.scale_step)
+        else:
+            return
+        self.apply_change()
+
+    def improve(self):
+        if self.scale < self.max_scale:
+            self.scale = min(self.max_scale, self.scale + self.scale_step)
+        elif self.msaa_index > 0:
+            self.msaa_index -= 1
+        else:
+            return
+        self.apply_change()
+
+    def apply_change(self):
+        self.frames_since_change = 0
+        self.frame_samples.clear()
+        self.create_framebuffers()
@@ -0,0 +1,218 @@
+import argparse
+import ctypes
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+
+class OfflineRenderer:
+    def __init__(self, scene, width, height, output_dir, frame_interval_ms=1000 / 30, pbo_count=3,
+                 image_format="png", writer_threads=2, camera_path=None, samples=4, warmup_frames=10):
+        self.scene = scene
+        self.width = width
+        self.height = height
+        self.output_dir = output_dir
+        self.frame_interval_ms = frame_interval_ms
+        self.pbo_count = pbo_count
+        self.image_format = image_format
+        self.writer_threads = writer_threads
+        # camera_path(frame) -> matriz 4x4 de la camara para ese frame
+        self.camera_path = camera_path
+        self.samples = samples
+        self.warmup_frames = warmup_frames
+        self.frame_bytes = width * height * 4
+        self.fbo = None
+        self.resolve_fbo = None
+        self.pbos = []
+        self.queue = None
+        self.writers = []
+
+    def initialize(self):
+        # En modo offline la escena no crea DynamicResolution: el framebuffer y su MSAA son de este renderizador
+        self.scene.offline = True
+        self.scene.interactive = False
+        self.scene.initialize()
+        self.scene.camera.set_viewport_size(self.width, self.height)
+        self.samples = min(self.samples, glGetIntegerv(GL_MAX_SAMPLES))
+        self.fbo = self.create_framebuffer(self.samples, with_depth=True)
+        if self.samples > 0:
+            # glReadPixels no lee de un framebuffer multimuestra: se resuelve antes a uno normal
+            self.resolve_fbo = self.create_framebuffer(0, with_depth=False)
+        self.pbos = list(glGenBuffers(self.pbo_count)) if self.pbo_count > 1 else [glGenBuffers(1)]
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_bytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+
+    def create_framebuffer(self, samples, with_depth):
+        fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+        color = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, color)
+        glRenderbufferStorageMultisample(GL_RENDERBUFFER, samples, GL_RGBA8, self.width, self.height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, color)
+        if with_depth:
+            depth = glGenRenderbuffers(1)
+            glBindRenderbuffer(GL_RENDERBUFFER, depth)
+            glRenderbufferStorageMultisample(GL_RENDERBUFFER, samples, GL_DEPTH_COMPONENT24, self.width, self.height)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, depth)
+        if glCheckFramebufferStatus(GL_FRAMEBUFFER) != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError("Offscreen framebuffer is incomplete")
+        return fbo
+
+    def render_frame(self, frame):
+        self.scene.sim_ticks = frame * self.frame_interval_ms
+        if self.camera_path is not None:
+            self.scene.camera.transformation = self.camera_path(frame)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+        self.scene.display()
+        if self.resolve_fbo is not None:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.resolve_fbo)
+            glBlitFramebuffer(0, 0, self.width, self.height, 0, 0, self.width, self.height,
+                              GL_COLOR_BUFFER_BIT, GL_NEAREST)
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.resolve_fbo)
+
+    def warm_up(self):
+        # Se descartan unos frames (subidas a la GPU, JIT de shaders en llvmpipe) y se vuelve al
+        # estado inicial, asi cada pasada cronometrada empieza igual
+        for frame in range(self.warmup_frames):
+            self.render_frame(frame)
+        glFinish()
+        self.scene.reset_simulation()
+
+    def start_writers(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        self.queue = queue.Queue(maxsize=self.pbo_count * 4)
+        self.writers = [threading.Thread(target=self.write_loop, args=(output_dir,), daemon=True)
+                        for _ in range(self.writer_threads)]
+        for writer in self.writers:
+            writer.start()
+
+    def stop_writers(self):
+        for _ in self.writers:
+            self.queue.put(None)
+        for writer in self.writers:
+            writer.join()
+        self.writers = []
+
+    def write_loop(self, output_dir):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            self.write_frame(output_dir, *item)
+
+    def write_frame(self, output_dir, frame, pixels):
+        path = os.path.join(output_dir, f"frame_{frame:05d}")
+        if self.image_format == "raw":
+            with open(path + ".rgba", "wb") as f:
+                f.write(pixels)
+        else:
+            # glReadPixels entrega las filas de abajo hacia arriba
+            surface = pygame.image.frombuffer(pixels, (self.width, self.height), "RGBA")
+            pygame.image.save(pygame.transform.flip(surface, False, True), path + ".png")
+
+    def read_pbo(self, pbo):
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        pointer = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, self.frame_bytes, GL_MAP_READ_BIT)
+        pixels = ctypes.string_at(pointer, self.frame_bytes)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        return pixels
+
+    def render_async(self, frames, output_dir):
+        # Cada frame se lee a un PBO del anillo y se mapea pbo_count - 1 frames despues,
+        # cuando la GPU ya termino la copia, asi glReadPixels no detiene el pipeline
+        self.warm_up()
+        self.start_writers(output_dir)
+        start = time.perf_counter()
+        for frame in range(frames):
+            self.render_frame(frame)
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[frame % len(self.pbos)])
+            glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+            pending = frame - (len(self.pbos) - 1)
+            if pending >= 0:
+                self.queue.put((pending, self.read_pbo(self.pbos[pending % len(self.pbos)])))
+        for pending in range(max(frames - (len(self.pbos) - 1), 0), frames):
+            self.queue.put((pending, self.read_pbo(self.pbos[pending % len(self.pbos)])))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.stop_writers()
+        return frames / (time.perf_counter() - start)
+
+    def render_sync(self, frames, output_dir):
+        # Misma cola de escritura que render_async: la comparacion solo difiere en la lectura,
+        # glReadPixels a memoria del cliente espera a que la GPU termine el frame
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.warm_up()
+        self.start_writers(output_dir)
+        start = time.perf_counter()
+        for frame in range(frames):
+            self.render_frame(frame)
+            pixels = glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE)
+            self.queue.put((frame, bytes(pixels)))
+        self.stop_writers()
+        return frames / (time.perf_counter() - start)
+
+    def run(self, frames, compare=False):
+        self.initialize()
+        fps = self.render_async(frames, self.output_dir)
+        print(f"Rendered {frames} frames to {self.output_dir} at {fps:.1f} fps "
+              f"({len(self.pbos)} PBOs, {self.writer_threads} writer threads)")
+        if compare:
+            sync_fps = self.render_sync(frames, os.path.join(self.output_dir, "sync"))
+            print(f"Synchronous glReadPixels: {sync_fps:.1f} fps ({self.writer_threads} writer threads), "
+                  f"PBO ring speedup x{fps / sync_fps:.2f}")
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        return fps
+
+
+def trace_camera_path(trace, frame_interval_ms):
+    # Camara de una traza grabada con SistemaSolar.py --record, muestreada al intervalo fijo del video
+    ticks = trace['ticks'] - trace['ticks'][0]
+
+    def camera_path(frame):
+        index = max(int(np.searchsorted(ticks, frame * frame_interval_ms, side='right')) - 1, 0)
+        return np.array(trace['camera'][index], np.float32)
+
+    return camera_path
+
+
+if __name__ == '__main__':
+    from sistemaSolar.GLApp.Camera.CameraTrace import load_trace
+    from sistemaSolar.GLApp.shaders.SistemaSolar import VertexShaderCameraDemo
+
+    parser = argparse.ArgumentParser(description="Render the solar system to an image sequence")
+    parser.add_argument("--frames", type=int, help="default 300, or the length of --trace")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--output", default="frames")
+    parser.add_argument("--format", choices=["png", "raw"], default="png")
+    parser.add_argument("--pbos", type=int, default=3)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--msaa", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=10, help="untimed frames before each pass")
+    parser.add_argument("--trace", help="camera path recorded with SistemaSolar.py --record")
+    parser.add_argument("--compare", action="store_true", help="also time synchronous readback")
+    args = parser.parse_args()
+
+    frame_interval_ms = 1000 / args.fps
+    camera_path = None
+    frames = args.frames or 300
+    if args.trace:
+        trace = load_trace(args.trace)
+        camera_path = trace_camera_path(trace, frame_interval_ms)
+        if args.frames is None:
+            frames = int((trace['ticks'][-1] - trace['ticks'][0]) / frame_interval_ms) + 1
+
+    OfflineRenderer(VertexShaderCameraDemo(hidden=True, offline=True), args.width, args.height,
+                    os.path.abspath(args.output), frame_interval_ms, args.pbos, args.format, args.writers, camera_path,
+                    args.msaa, args.warmup).run(frames, args.compare)
+    pygame.quit()
@@ -48,7 +48,17 @@ class Camera:
         if angle < 170 and pitch > 0 or angle > 30 and pitch < 0:
             self.transformation = rotate(self.transformation, pitch, "x", True)
 
+    def set_viewport_size(self, width, height):
+        self.screen_width = width
+        self.screen_height = height
+        self.projection_matrix = perspective_mat(60, width / height, 0.01, 10000)
+        self.projection.data = self.projection_matrix
+
     def update(self):
+        self.handle_input()
+        self.apply()
+
+    def handle_input(self):
         mouse_pos = pygame.mouse.get_pos()
         mouse_change = self.last_mouse - pygame.math.Vector2(mouse_pos)
         pygame.mouse.set_pos((self.screen_width / 2, self.screen_height / 2))
@@ -74,7 +84,7 @@ class Camera:
             set_orbit_paused()
             print(f"Orbit paused: {orbit_paused}")
 
-
+    def apply(self):
         self.projection.load()
         lookat = Uniform("mat4", self.transformation)
         lookat.find_variable(self.program_id, "viewMatrix")
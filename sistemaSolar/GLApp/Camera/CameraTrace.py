@@ -0,0 +1,61 @@
+import json
+import struct
+
+import numpy as np
+
+TRACE_MAGIC = b'SSTR'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sII')
+# Por frame: reloj de la simulacion (ms), orbitas pausadas, matriz camara->mundo y tiempo del frame
+TRACE_FRAME = np.dtype([
+    ('ticks', '<f8'),
+    ('paused', 'u1'),
+    ('camera', '<f4', (4, 4)),
+    ('frame_ms', '<f4'),
+])
+
+
+class CameraRecorder:
+    # Guarda por frame el resultado de la entrada (la matriz de la camara) en vez de la entrada misma:
+    # asi la reproduccion no depende de set_pos del raton ni de la sensibilidad
+    def __init__(self, path):
+        self.path = path
+        self.frames = []
+
+    def record(self, ticks, camera_matrix, paused, frame_ms):
+        self.frames.append((ticks, paused, np.asarray(camera_matrix, np.float32), frame_ms))
+
+    def save(self):
+        frames = np.array(self.frames, TRACE_FRAME)
+        with open(self.path, 'wb') as f:
+            f.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, len(frames)))
+            f.write(frames.tobytes())
+        print(f'Recorded {len(frames)} frames to {self.path} ({TRACE_HEADER.size + frames.nbytes} bytes)')
+
+
+def load_trace(path):
+    with open(path, 'rb') as f:
+        magic, version, count = TRACE_HEADER.unpack(f.read(TRACE_HEADER.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f'{path} is not a version {TRACE_VERSION} camera trace')
+        frames = np.frombuffer(f.read(count * TRACE_FRAME.itemsize), TRACE_FRAME)
+    if len(frames) != count:
+        raise ValueError(f'{path} is truncated: expected {count} frames, found {len(frames)}')
+    return frames
+
+
+def frame_time_summary(frame_ms):
+    frame_ms = np.asarray(frame_ms, np.float64)
+    return {
+        "frames": int(len(frame_ms)),
+        "mean_ms": float(frame_ms.mean()),
+        "p50_ms": float(np.percentile(frame_ms, 50)),
+        "p95_ms": float(np.percentile(frame_ms, 95)),
+        "p99_ms": float(np.percentile(frame_ms, 99)),
+        "max_ms": float(frame_ms.max()),
+    }
+
+
+def save_frame_times(path, frame_ms):
+    with open(path, 'w') as f:
+        json.dump({"summary": frame_time_summary(frame_ms), "frame_ms": [float(ms) for ms in frame_ms]}, f, indent=2)
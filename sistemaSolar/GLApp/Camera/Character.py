@@ -10,16 +10,23 @@ class Character:
         self.transformation = identity_mat()  # Inicialmente, la nave está en la posición y orientación inicial
 
         self.skin = ObjTextureMesh(self.program_id, obj, texture)
+        self.scale = 0.005
+        # Posicion en el mundo y radio de la esfera envolvente, para colisiones y proximidad
+        self.position = np.zeros(3)
+        self.radius = self.skin.bounding_radius * self.scale
 
     def update_position(self, translation):
+        self.skin.draw(self.place(translation))
+
+    def place(self, translation):
         # Actualiza la posición de la nave aplicando una matriz de traslación
         translation = translate(translation, -0.0035, -0.005, -0.016) #x negativa hacia la izquierda, z negativo hacia adelante
         translation = rotate(translation, 90, 'y')
         #translation = rotate(translation, 45, 'z')
         self.transformation = np.dot(self.transformation, translation)
 
-        translation = scale(translation, 0.005, 0.005, 0.005)  # 0.001
-        self.skin.draw(translation)
+        self.position = np.array(translation[:3, 3], np.float64)
+        return scale(translation, self.scale, self.scale, self.scale)  # 0.001
 
 
 
@@ -1,38 +1,103 @@
+import ctypes
+
+import numpy as np
 from OpenGL.GL import *
 
-from sistemaSolar.GLApp.Mesh.texture.Texture import Texture
-from sistemaSolar.GLApp.Utils.GraphicsData import GraphicsData
+from sistemaSolar.GLApp.Mesh.texture.Texture import Texture, solid_color_texture
+from sistemaSolar.GLApp.Utils.InterleavedData import InterleavedData, vertex_stride
 from sistemaSolar.GLApp.Utils.Uniform import Uniform
+from sistemaSolar.config import vertex_layout, mesh_lod_thresholds
 
 
 class BaseTextureMesh:
-    def __init__(self, program_id, vertices, vertex_uvs, vertex_normals, vertex_colors, draw_type, texture_filename):
+    def __init__(self, program_id, vertices, vertex_uvs, vertex_normals, color, draw_type, texture_filename,
+                 residency=None, layout=None, indices=None, lods=None):
         self.program_id = program_id
         self.vertices = vertices
         self.vertex_uvs = vertex_uvs
         self.vertex_normals = vertex_normals
+        self.layout = layout if layout is not None else vertex_layout
         self.draw_type = draw_type
-        self.vao_ref = glGenVertexArrays(1)
-        glBindVertexArray(self.vao_ref)
-        position_variable = GraphicsData("vec3", self.vertices)
-        position_variable.create_variable(program_id, "position")
-        color_variable = GraphicsData("vec3", vertex_colors)
-        color_variable.create_variable(program_id, "vertexColor")
-        normal_variable = GraphicsData("vec3", self.vertex_normals)
-        normal_variable.create_variable(program_id, "vertexNormal")
-        uvs_variable = GraphicsData("vec2", self.vertex_uvs)
-        uvs_variable.create_variable(program_id, "vertexUv")
-        self.image = Texture(texture_filename)
+        self.indices = None if indices is None else np.asarray(indices, np.uint16 if len(vertices) < 65536 else np.uint32)
+        # (offset, cantidad) de cada LOD dentro del buffer de indices, el primero es la malla completa
+        self.lods = lods if lods is not None else [(0, len(self.indices) if indices is not None else len(vertices))]
+        self.vao_ref = None
+        self.vertex_data = None
+        self.index_ref = None
+        self.color = Uniform("vec3", color)
+        self.color.find_variable(self.program_id, "meshColor")
+        # Radio de la esfera envolvente en espacio del modelo, usado para estimar el tamaño en pantalla
+        self.bounding_radius = float(np.max(np.linalg.norm(np.array(vertices, np.float32), axis=1))) if len(vertices) > 0 else 0.0
+        self.geometry_bytes = len(vertices) * vertex_stride(self.layout) + (self.indices.nbytes if indices is not None else 0)
+        self.residency = residency
+        self.image = Texture(texture_filename, upload=residency is None)
         self.texture = Uniform("sampler2D", [self.image.texture_id, 1])
         self.texture.find_variable(self.program_id, "tex")
+        if residency is None:
+            self.load_geometry()
+
+    @property
+    def geometry_resident(self):
+        return self.vao_ref is not None
+
+    def load_geometry(self):
+        if self.vao_ref is not None:
+            return
+        self.vao_ref = glGenVertexArrays(1)
+        glBindVertexArray(self.vao_ref)
+        self.vertex_data = InterleavedData(self.layout, self.vertices, self.vertex_normals, self.vertex_uvs)
+        self.vertex_data.create_variables(self.program_id)
+        self.geometry_bytes = self.vertex_data.size_bytes
+        if self.indices is not None:
+            self.index_ref = glGenBuffers(1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.index_ref)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices, GL_STATIC_DRAW)
+            self.geometry_bytes += self.indices.nbytes
+        glBindVertexArray(0)
+
+    def unload_geometry(self):
+        if self.vao_ref is None:
+            return
+        self.vertex_data.delete()
+        self.vertex_data = None
+        if self.index_ref is not None:
+            glDeleteBuffers(1, [self.index_ref])
+            self.index_ref = None
+        glDeleteVertexArrays(1, [self.vao_ref])
+        self.vao_ref = None
 
     def draw(
             self,
             transformation_matrix
     ):
+        angular_radius = None
+        if self.residency is not None:
+            angular_radius = self.residency.touch(self, transformation_matrix)
+        if self.vao_ref is None:
+            # Geometria fuera de la GPU: el cuerpo esta por debajo de geometry_threshold (menos de un pixel)
+            return
+        if self.image.resident:
+            self.texture.data[0] = self.image.texture_id
+        else:
+            self.texture.data[0] = solid_color_texture(self.image.average_color)
         self.texture.load()
+        self.color.load()
         transformation = Uniform("mat4", transformation_matrix)
         transformation.find_variable(self.program_id, "modelMatrix")
         transformation.load()
         glBindVertexArray(self.vao_ref)
-        glDrawArrays(self.draw_type, 0, len(self.vertices))
+        offset, count = self.lods[self.select_lod(angular_radius)]
+        if self.indices is None:
+            glDrawArrays(self.draw_type, offset, count)
+        else:
+            glDrawElements(self.draw_type, count, GL_UNSIGNED_SHORT if self.indices.dtype == np.uint16 else GL_UNSIGNED_INT,
+                           ctypes.c_void_p(offset * self.indices.itemsize))
+
+    def select_lod(self, angular_radius):
+        lod = 0
+        if angular_radius is not None:
+            for threshold in mesh_lod_thresholds[:len(self.lods) - 1]:
+                if angular_radius >= threshold:
+                    break
+                lod += 1
+        return lod
@@ -1,10 +1,22 @@
+import hashlib
+import os
 import random
+import zipfile
+
+import numpy as np
 from OpenGL.GL import *
 
 from sistemaSolar.GLApp.Mesh.Light.BaseTextureMesh import BaseTextureMesh
+from sistemaSolar.GLApp.Mesh.MeshOptimizer import optimize_mesh, OPTIMIZER_VERSION
+from sistemaSolar.GLApp.Utils.InterleavedData import LEGACY_STRIDE, vertex_stride
+from sistemaSolar.config import vertex_layout, mesh_lod_ratios, mesh_cache_dir
+
+# Mallas ya procesadas por archivo: los planetas y satelites comparten el mismo modelo
+_optimized_meshes = {}
 
 
 def load_mesh(filename):
+    # Devuelve vertices unicos (combinaciones v/vt/vn) y las caras como listas de indices
     vertices = []
     faces = []
     vertex_normals = []
@@ -14,33 +26,73 @@ def load_mesh(filename):
         vertices_aux = []
         normals_aux = []
         uvs_aux = []
+        corners = {}
         while line:
             line_tokens = line.split()
             if len(line_tokens) > 0:
                 if line_tokens[0] == 'v':
-                    vertices_aux.append([float(x) for x in line_tokens[1:]])
+                    vertices_aux.append([float(x) for x in line_tokens[1:4]])
                 elif line_tokens[0] == 'vn':
-                    normals_aux.append([float(x) for x in line_tokens[1:]])
+                    normals_aux.append([float(x) for x in line_tokens[1:4]])
                 elif line_tokens[0] == 'vt':
-                    uvs_aux.append([float(x) for x in line_tokens[1:]])
+                    uvs_aux.append([float(x) for x in line_tokens[1:3]])
                 elif line_tokens[0] == 'f':
                     faces.append([x for x in line_tokens[1:]])
             line = f.readline()
-        for face_info in faces:
+        for i, face_info in enumerate(faces):
+            face = []
             for vertex_info in face_info:
-                tokens = [int(x) - 1 for x in vertex_info.split("/")]
-                vertices.append(vertices_aux[tokens[0]])
-                vertex_uvs.append(uvs_aux[tokens[1]])
-                vertex_normals.append(normals_aux[tokens[2]])
+                if vertex_info not in corners:
+                    tokens = [int(x) - 1 if x else None for x in vertex_info.split("/")] + [None, None]
+                    corners[vertex_info] = len(vertices)
+                    vertices.append(vertices_aux[tokens[0]])
+                    vertex_uvs.append(uvs_aux[tokens[1]] if tokens[1] is not None else [0, 0])
+                    vertex_normals.append(normals_aux[tokens[2]] if tokens[2] is not None else [0, 0, 0])
+                face.append(corners[vertex_info])
+            faces[i] = face
         print(f'Loaded {len(vertices)} {len(faces)}')
     return vertices, vertex_uvs, vertex_normals, faces
 
 
+def load_optimized_mesh(filename, lod_ratios=(), cache_dir=mesh_cache_dir):
+    # El procesado (triangulacion, orden de cache, LODs) se guarda en disco y solo se repite si cambia el .obj
+    with open(filename, 'rb') as f:
+        key = hashlib.sha256(f.read() + repr((tuple(lod_ratios), OPTIMIZER_VERSION)).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, key + '.npz') if cache_dir is not None else None
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as data:
+                mesh = (data['indices'], data['vertices'], data['vertex_uvs'], data['vertex_normals'],
+                        [tuple(lod) for lod in data['lods'].tolist()])
+            print(f'Mesh cache hit for {filename}')
+            return mesh
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+            # Entrada corrupta (proceso interrumpido, disco lleno...): se trata como un fallo de cache
+            print(f'Ignoring unreadable mesh cache {cache_path}: {e}')
+    indices, vertices, vertex_uvs, vertex_normals, lods = optimize_mesh(*load_mesh(filename), lod_ratios=lod_ratios,
+                                                                        name=filename)
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = cache_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, indices=indices, vertices=vertices, vertex_uvs=vertex_uvs,
+                         vertex_normals=vertex_normals, lods=np.array(lods, np.int64))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f'Could not store optimized mesh: {e}')
+    return indices, vertices, vertex_uvs, vertex_normals, lods
+
+
 class ObjTextureMesh(BaseTextureMesh):
-    def __init__(self, program_id, filename, texture_filename):
-        vertices, vertex_uvs, vertex_normals, faces = load_mesh(filename)
-        colors = []
-        for i in range(len(vertices)):
-            colors.append([1, 1, 1])
-        draw_type_aux = GL_TRIANGLES if len(faces[0]) == 3 else GL_QUADS
-        super().__init__(program_id, vertices, vertex_uvs, vertex_normals, colors, draw_type_aux, texture_filename)
+    def __init__(self, program_id, filename, texture_filename, residency=None, layout=None, lod_ratios=None):
+        lod_ratios = tuple(lod_ratios if lod_ratios is not None else mesh_lod_ratios)
+        key = (filename, lod_ratios)
+        if key not in _optimized_meshes:
+            _optimized_meshes[key] = load_optimized_mesh(filename, lod_ratios)
+        indices, vertices, vertex_uvs, vertex_normals, lods = _optimized_meshes[key]
+        layout = layout if layout is not None else vertex_layout
+        print(f'Vertex format: {LEGACY_STRIDE} -> {vertex_stride(layout)} bytes per vertex '
+              f'({len(vertices)} unique vertices, {len(indices)} indices)')
+        super().__init__(program_id, vertices, vertex_uvs, vertex_normals, [1, 1, 1], GL_TRIANGLES,
+                         texture_filename, residency, layout, indices, lods)
@@ -0,0 +1,324 @@
+import heapq
+import sys
+import time
+
+import numpy as np
+
+# Se incluye en la llave de la cache de mallas: subirla al cambiar el resultado de optimize_mesh
+OPTIMIZER_VERSION = 1
+
+# Parametros del algoritmo de Tom Forsyth ("Linear-Speed Vertex Cache Optimisation")
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_TRI_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+
+def polygon_normal(points):
+    # Metodo de Newell, funciona con poligonos no convexos
+    normal = np.zeros(3)
+    for i in range(len(points)):
+        current, following = points[i], points[(i + 1) % len(points)]
+        normal[0] += (current[1] - following[1]) * (current[2] + following[2])
+        normal[1] += (current[2] - following[2]) * (current[0] + following[0])
+        normal[2] += (current[0] - following[0]) * (current[1] + following[1])
+    return normal
+
+
+def triangulate_polygon(polygon, positions):
+    if len(polygon) == 3:
+        return [list(polygon)]
+    points = np.asarray([positions[i] for i in polygon], np.float64)
+    # Se proyecta al plano que mas area conserva y se recortan orejas
+    axis = int(np.argmax(np.abs(polygon_normal(points))))
+    points_2d = np.delete(points, axis, axis=1)
+    area = 0.0
+    for i in range(len(points_2d)):
+        x0, y0 = points_2d[i]
+        x1, y1 = points_2d[(i + 1) % len(points_2d)]
+        area += x0 * y1 - x1 * y0
+    orientation = 1.0 if area >= 0 else -1.0
+
+    remaining = list(range(len(polygon)))
+    triangles = []
+    while len(remaining) > 3:
+        for k in range(len(remaining)):
+            a, b, c = remaining[k - 1], remaining[k], remaining[(k + 1) % len(remaining)]
+            pa, pb, pc = points_2d[a], points_2d[b], points_2d[c]
+            cross = (pb[0] - pa[0]) * (pc[1] - pa[1]) - (pb[1] - pa[1]) * (pc[0] - pa[0])
+            if cross * orientation <= 0:
+                continue
+            if any(point_in_triangle(points_2d[j], pa, pb, pc) for j in remaining if j not in (a, b, c)):
+                continue
+            triangles.append([polygon[a], polygon[b], polygon[c]])
+            remaining.pop(k)
+            break
+        else:
+            # Poligono degenerado: se termina en abanico
+            break
+    for k in range(1, len(remaining) - 1):
+        triangles.append([polygon[remaining[0]], polygon[remaining[k]], polygon[remaining[k + 1]]])
+    return triangles
+
+
+def point_in_triangle(p, a, b, c):
+    d1 = (p[0] - b[0]) * (a[1] - b[1]) - (a[0] - b[0]) * (p[1] - b[1])
+    d2 = (p[0] - c[0]) * (b[1] - c[1]) - (b[0] - c[0]) * (p[1] - c[1])
+    d3 = (p[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (p[1] - a[1])
+    has_negative = d1 < 0 or d2 < 0 or d3 < 0
+    has_positive = d1 > 0 or d2 > 0 or d3 > 0
+    return not (has_negative and has_positive)
+
+
+def triangulate(polygons, positions):
+    triangles = []
+    for polygon in polygons:
+        triangles.extend(triangulate_polygon(polygon, positions))
+    return np.array(triangles, np.uint32).reshape(-1, 3)
+
+
+def acmr(indices, cache_size=CACHE_SIZE):
+    # Average cache miss ratio de una cache FIFO: vertices transformados por triangulo
+    indices = np.asarray(indices).ravel()
+    if len(indices) == 0:
+        return 0.0
+    cache = []
+    cached = set()
+    misses = 0
+    for index in indices.tolist():
+        if index in cached:
+            continue
+        misses += 1
+        cache.append(index)
+        cached.add(index)
+        if len(cache) > cache_size:
+            cached.discard(cache.pop(0))
+    return misses / (len(indices) / 3)
+
+
+def vertex_score(cache_position, remaining_valence):
+    if remaining_valence == 0:
+        return -1.0
+    score = 0.0
+    if cache_position >= 0:
+        if cache_position < 3:
+            score = LAST_TRI_SCORE
+        else:
+            score = (1.0 - (cache_position - 3) / (CACHE_SIZE - 3)) ** CACHE_DECAY_POWER
+    return score + VALENCE_BOOST_SCALE * remaining_valence ** -VALENCE_BOOST_POWER
+
+
+def optimize_vertex_cache(indices, vertex_count):
+    triangles = np.asarray(indices, np.uint32).reshape(-1, 3).tolist()
+    vertex_triangles = [[] for _ in range(vertex_count)]
+    for t, triangle in enumerate(triangles):
+        for v in triangle:
+            vertex_triangles[v].append(t)
+    remaining = [len(ts) for ts in vertex_triangles]
+    cache_position = [-1] * vertex_count
+    scores = [vertex_score(-1, remaining[v]) for v in range(vertex_count)]
+    triangle_scores = [sum(scores[v] for v in triangle) for triangle in triangles]
+    emitted = [False] * len(triangles)
+    order = []
+    cache = []
+    best = max(range(len(triangles)), key=triangle_scores.__getitem__) if triangles else -1
+    next_unemitted = 0
+
+    while best >= 0:
+        emitted[best] = True
+        order.append(triangles[best])
+        for v in triangles[best]:
+            vertex_triangles[v].remove(best)
+            remaining[v] -= 1
+            if v in cache:
+                cache.remove(v)
+            cache.insert(0, v)
+        evicted = cache[CACHE_SIZE:]
+        del cache[CACHE_SIZE:]
+        for v in evicted:
+            cache_position[v] = -1
+
+        touched = set()
+        for position, v in enumerate(cache):
+            cache_position[v] = position
+        for v in cache + evicted:
+            new_score = vertex_score(cache_position[v], remaining[v])
+            delta = new_score - scores[v]
+            scores[v] = new_score
+            for t in vertex_triangles[v]:
+                triangle_scores[t] += delta
+                touched.add(t)
+
+        best = -1
+        best_score = -1.0
+        for t in touched:
+            if triangle_scores[t] > best_score:
+                best, best_score = t, triangle_scores[t]
+        if best < 0:
+            # Ningun triangulo comparte vertices con la cache: se toma el siguiente sin emitir
+            while next_unemitted < len(triangles) and emitted[next_unemitted]:
+                next_unemitted += 1
+            best = next_unemitted if next_unemitted < len(triangles) else -1
+    return np.array(order, np.uint32).reshape(-1, 3)
+
+
+def optimize_vertex_fetch(indices, *attributes):
+    # Renumera los vertices en orden de primer uso para que las lecturas del VBO sean secuenciales
+    indices = np.asarray(indices, np.uint32)
+    vertex_count = len(attributes[0])
+    remap = np.full(vertex_count, -1, np.int64)
+    order = []
+    for index in indices.ravel().tolist():
+        if remap[index] < 0:
+            remap[index] = len(order)
+            order.append(index)
+    order = np.array(order, np.int64)
+    return (remap[indices].astype(np.uint32),) + tuple(np.asarray(a)[order] for a in attributes)
+
+
+def face_quadrics(positions, triangles):
+    p0, p1, p2 = (positions[triangles[:, k]] for k in range(3))
+    normals = np.cross(p1 - p0, p2 - p0)
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    normals[valid] /= lengths[valid, None]
+    planes = np.hstack([normals, -np.sum(normals * p0, axis=1, keepdims=True)])
+    # Ponderado por area para que los triangulos grandes pesen mas
+    return planes[:, :, None] * planes[:, None, :] * (lengths / 2)[:, None, None]
+
+
+def cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def simplify(indices, positions, target_ratio, normals=None, uvs=None):
+    # Colapso de aristas por cuadricas (Garland-Heckbert) en su variante de media arista: el vertice
+    # eliminado se mueve sobre uno existente, asi todos los LODs comparten el VBO. La topologia se
+    # calcula sobre posiciones soldadas para poder colapsar a traves de costuras de uv/normales
+    attribute_positions = np.asarray(positions, np.float64)
+    welded, weld = np.unique(attribute_positions, axis=0, return_inverse=True)
+    weld = weld.ravel()
+    corners = np.asarray(indices, np.uint32).reshape(-1, 3).tolist()
+    triangles = [[int(weld[c]) for c in corner] for corner in corners]
+    attributes = np.hstack([np.asarray(a, np.float64).reshape(len(attribute_positions), -1)
+                            for a in (normals, uvs) if a is not None] or [np.zeros((len(attribute_positions), 0))])
+    target = max(int(len(triangles) * target_ratio), 1)
+    vertex_count = len(welded)
+    variants = [[] for _ in range(vertex_count)]
+    for a, w in enumerate(weld.tolist()):
+        variants[w].append(a)
+
+    welded_triangles = np.array(triangles, np.int64).reshape(-1, 3)
+    quadrics = np.zeros((vertex_count, 4, 4))
+    for k in range(3):
+        np.add.at(quadrics, welded_triangles[:, k], face_quadrics(welded, welded_triangles))
+    vertex_triangles = [set() for _ in range(vertex_count)]
+    edge_count = {}
+    for t, (a, b, c) in enumerate(triangles):
+        for v in (a, b, c):
+            vertex_triangles[v].add(t)
+        for u, v in ((a, b), (b, c), (c, a)):
+            key = (min(u, v), max(u, v))
+            edge_count[key] = edge_count.get(key, 0) + 1
+    # Los bordes abiertos no se mueven para no cambiar la silueta ni abrir grietas
+    locked = np.zeros(vertex_count, bool)
+    for (u, v), count in edge_count.items():
+        if count == 1:
+            locked[u] = locked[v] = True
+
+    homogeneous = np.hstack([welded, np.ones((vertex_count, 1))])
+    welded = welded.tolist()
+
+    def collapse_cost(u, v):
+        p = homogeneous[v]
+        return float(p @ (quadrics[u] + quadrics[v]) @ p)
+
+    heap = []
+    for (u, v) in edge_count:
+        if not locked[u]:
+            heapq.heappush(heap, (collapse_cost(u, v), u, v))
+        if not locked[v]:
+            heapq.heappush(heap, (collapse_cost(v, u), v, u))
+
+    alive = len(triangles)
+    removed = np.zeros(vertex_count, bool)
+    dead = [False] * len(triangles)
+    while heap and alive > target:
+        cost, u, v = heapq.heappop(heap)
+        if removed[u] or removed[v] or not any(v in triangles[t] for t in vertex_triangles[u]):
+            continue
+        if abs(cost - collapse_cost(u, v)) > 1e-12 * max(1.0, abs(cost)):
+            continue
+        if flips_normal(triangles, vertex_triangles[u], welded, u, v):
+            continue
+        for t in list(vertex_triangles[u]):
+            triangle = triangles[t]
+            if v in triangle:
+                dead[t] = True
+                alive -= 1
+                for w in triangle:
+                    vertex_triangles[w].discard(t)
+            else:
+                k = triangle.index(u)
+                triangle[k] = v
+                # La esquina pasa a la variante de v con atributos mas parecidos
+                source = attributes[corners[t][k]]
+                corners[t][k] = min(variants[v], key=lambda a: float(np.sum((attributes[a] - source) ** 2)))
+                vertex_triangles[v].add(t)
+        vertex_triangles[u] = set()
+        removed[u] = True
+        quadrics[v] += quadrics[u]
+        neighbours = {w for t in vertex_triangles[v] for w in triangles[t] if w != v}
+        for w in neighbours:
+            if not locked[v]:
+                heapq.heappush(heap, (collapse_cost(v, w), v, w))
+            if not locked[w]:
+                heapq.heappush(heap, (collapse_cost(w, v), w, v))
+    return np.array([c for c, d in zip(corners, dead) if not d], np.uint32).reshape(-1, 3)
+
+
+def flips_normal(triangles, around, positions, u, v):
+    for t in around:
+        triangle = triangles[t]
+        if v in triangle:
+            continue
+        p = [positions[w] for w in triangle]
+        moved = [positions[v] if w == u else positions[w] for w in triangle]
+        before = cross([p[1][k] - p[0][k] for k in range(3)], [p[2][k] - p[0][k] for k in range(3)])
+        after = cross([moved[1][k] - moved[0][k] for k in range(3)], [moved[2][k] - moved[0][k] for k in range(3)])
+        if sum(b * a for b, a in zip(before, after)) <= 0:
+            return True
+    return False
+
+
+def optimize_mesh(positions, uvs, normals, polygons, lod_ratios=(), name="mesh"):
+    start = time.perf_counter()
+    positions = np.asarray(positions, np.float32)
+    triangles = triangulate(polygons, positions)
+    acmr_before = acmr(triangles)
+    triangles = optimize_vertex_cache(triangles, len(positions))
+    lods = [triangles]
+    for ratio in lod_ratios:
+        # Cada LOD parte del anterior, la proporcion sigue siendo respecto a la malla completa
+        ratio = ratio * len(triangles) / len(lods[-1])
+        lods.append(optimize_vertex_cache(simplify(lods[-1], positions, ratio, normals, uvs), len(positions)))
+    # Todos los LODs van seguidos en el mismo buffer de indices
+    all_indices, positions, uvs, normals = optimize_vertex_fetch(
+        np.concatenate(lods), positions, np.asarray(uvs, np.float32), np.asarray(normals, np.float32))
+    ranges = []
+    offset = 0
+    for lod in lods:
+        ranges.append((offset, lod.size))
+        offset += lod.size
+    print(f'Optimized {name}: {len(polygons)} polygons -> {len(lods[0])} triangles, '
+          f'ACMR {acmr_before:.3f} -> {acmr(lods[0]):.3f}, '
+          f'LODs {[len(lod) for lod in lods]} in {(time.perf_counter() - start) * 1000:.0f} ms')
+    return all_indices.ravel(), positions, uvs, normals, ranges
+
+
+if __name__ == '__main__':
+    from sistemaSolar.GLApp.Mesh.Light.ObjTextureMesh import load_mesh
+
+    for filename in sys.argv[1:]:
+        optimize_mesh(*load_mesh(filename)[:4], lod_ratios=(0.5, 0.25), name=filename)
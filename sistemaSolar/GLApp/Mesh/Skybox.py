@@ -0,0 +1,70 @@
+from OpenGL.GL import *
+
+from sistemaSolar.GLApp.Mesh.Light.ObjTextureMesh import ObjTextureMesh
+from sistemaSolar.GLApp.Transformations.Transformations import identity_mat
+from sistemaSolar.GLApp.Utils.Uniform import Uniform
+from sistemaSolar.GLApp.Utils.Utils import create_program
+
+skybox_vertex_shader = r'''
+#version 330 core
+
+in vec3 position;
+in vec2 vertexUv;
+
+uniform mat4 projectionMatrix;
+uniform mat4 viewRotation;
+
+out vec2 uv;
+void main()
+{
+    vec4 clip = projectionMatrix * viewRotation * vec4(position, 1);
+    // z = w deja el fondo en el plano lejano tras la division de perspectiva
+    gl_Position = clip.xyww;
+    uv = vertexUv;
+}
+'''
+
+skybox_fragment_shader = r'''
+#version 330 core
+
+in vec2 uv;
+uniform sampler2D tex;
+uniform float brightness;
+
+out vec4 fragColor;
+
+void main(){
+    fragColor = vec4(brightness * texture(tex, uv).rgb, 1);
+}
+'''
+
+
+class Skybox:
+    # Fondo de estrellas sin iluminacion. Se dibuja al final con profundidad en el plano lejano y
+    # GL_LEQUAL, asi el early-z descarta los pixeles que ya cubren los planetas y la nave
+    def __init__(self, obj, texture, brightness=0.5):
+        self.program_id = create_program(skybox_vertex_shader, skybox_fragment_shader)
+        self.mesh = ObjTextureMesh(self.program_id, obj, texture)
+        self.projection = Uniform("mat4", identity_mat())
+        self.projection.find_variable(self.program_id, "projectionMatrix")
+        self.view_rotation = Uniform("mat4", identity_mat())
+        self.view_rotation.find_variable(self.program_id, "viewRotation")
+        self.brightness_location = glGetUniformLocation(self.program_id, "brightness")
+        self.brightness = brightness
+
+    def draw(self, projection_matrix, camera_matrix):
+        # La camara guarda la transformacion camara->mundo; la vista es su inversa y para una
+        # rotacion pura basta con transponer el bloque 3x3, sin la traslacion
+        view_rotation = identity_mat()
+        view_rotation[:3, :3] = camera_matrix[:3, :3].T
+        glUseProgram(self.program_id)
+        self.projection.data = projection_matrix
+        self.projection.load()
+        self.view_rotation.data = view_rotation
+        self.view_rotation.load()
+        glUniform1f(self.brightness_location, self.brightness)
+        glDepthFunc(GL_LEQUAL)
+        glDepthMask(GL_FALSE)
+        self.mesh.draw(identity_mat())
+        glDepthMask(GL_TRUE)
+        glDepthFunc(GL_LESS)
@@ -2,15 +2,40 @@ import pygame
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
+# Texturas de 1x1 compartidas por color, usadas mientras la textura real no esta en la GPU
+_solid_color_textures = {}
+
+
+def solid_color_texture(color) -> int:
+    color = tuple(int(c) for c in color[:3])
+    if color not in _solid_color_textures:
+        texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture_id)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, 1, 1, 0, GL_RGBA, GL_UNSIGNED_BYTE, bytes(color + (255,)))
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        _solid_color_textures[color] = texture_id
+    return _solid_color_textures[color]
+
 
 class Texture:
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, upload: bool = True):
         self.surface = None
-        self.texture_id = glGenTextures(1)
+        self.texture_id = None
         self.surface = pygame.image.load(filename)
-        self.load()
+        # RGBA8 mas ~1/3 extra por la cadena de mipmaps
+        self.size_bytes = self.surface.get_width() * self.surface.get_height() * 4 * 4 // 3
+        self.average_color = pygame.transform.average_color(self.surface)
+        if upload:
+            self.load()
+
+    @property
+    def resident(self) -> bool:
+        return self.texture_id is not None
 
     def load(self) -> None:
+        if self.texture_id is None:
+            self.texture_id = glGenTextures(1)
         width, height = self.surface.get_width(), self.surface.get_height()
         pixel_data = pygame.image.tostring(self.surface, "RGBA", 1)
         glBindTexture(GL_TEXTURE_2D, self.texture_id)
@@ -21,3 +46,7 @@ class Texture:
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
         glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
 
+    def unload(self) -> None:
+        if self.texture_id is not None:
+            glDeleteTextures(1, [self.texture_id])
+            self.texture_id = None
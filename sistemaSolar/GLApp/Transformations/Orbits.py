@@ -0,0 +1,30 @@
+import numpy as np
+
+from sistemaSolar.GLApp.Transformations.Transformations import identity_mat, scale, translate, rotate
+
+
+def planet_transform(orbit_radius, orbital_speed, valor, axial_rotation_angle, scale_factor):
+    angular_speed = 2 * np.pi / orbital_speed if orbital_speed != 0 else 0
+    angular_position = (valor * angular_speed) % (2 * np.pi)
+
+    x = orbit_radius * np.cos(angular_position)
+    y = 0
+    z = orbit_radius * np.sin(angular_position)
+
+    transformation = identity_mat()
+    transformation = translate(transformation, x, y, z)
+    transformation = rotate(transformation, axial_rotation_angle, 'y')
+    return scale(transformation, scale_factor, scale_factor, scale_factor)
+
+
+def satellite_transform(planet_transformation, orbit_radius, rotation_speed_self, ticks, rotation_angle, scale_factor):
+    # La rotación del satélite debe ser independiente de si los planetas están pausados
+    orbit_angle = (ticks * rotation_speed_self) % 360
+
+    x = orbit_radius * np.cos(np.radians(orbit_angle))
+    z = orbit_radius * np.sin(np.radians(orbit_angle))
+
+    transform = translate(identity_mat(), planet_transformation[0][3] + x, planet_transformation[1][3],
+                          planet_transformation[2][3] + z)
+    transform = rotate(transform, rotation_angle, 'y')
+    return scale(transform, scale_factor, scale_factor, scale_factor)
@@ -0,0 +1,38 @@
+from OpenGL.GL import *
+
+
+class GpuTimer:
+    # Mide el tiempo de GPU de un bloque de dibujo con un par de marcas GL_TIMESTAMP. A diferencia de
+    # GL_TIME_ELAPSED, que solo admite una consulta activa, los temporizadores se pueden anidar (el
+    # del frame completo y el del fondo). Los resultados se leen varios frames despues para no detener
+    # el pipeline esperando a la consulta. end() devuelve la ultima medida disponible en ms (o None);
+    # con report_every=None no imprime nada
+    def __init__(self, name, report_every=120, latency=4):
+        self.name = name
+        self.report_every = report_every
+        self.latency = latency
+        queries = list(glGenQueries(2 * latency))
+        self.queries = list(zip(queries[::2], queries[1::2]))
+        self.frame = 0
+        self.total_ns = 0
+        self.samples = 0
+
+    def begin(self):
+        glQueryCounter(self.queries[self.frame % self.latency][0], GL_TIMESTAMP)
+
+    def end(self):
+        glQueryCounter(self.queries[self.frame % self.latency][1], GL_TIMESTAMP)
+        self.frame += 1
+        if self.frame < self.latency:
+            return None
+        start, end = self.queries[self.frame % self.latency]
+        if not glGetQueryObjectiv(end, GL_QUERY_RESULT_AVAILABLE):
+            return None
+        elapsed_ns = int(glGetQueryObjectui64v(end, GL_QUERY_RESULT)) - int(glGetQueryObjectui64v(start, GL_QUERY_RESULT))
+        self.total_ns += elapsed_ns
+        self.samples += 1
+        if self.report_every is not None and self.samples >= self.report_every:
+            print(f'{self.name}: {self.total_ns / self.samples / 1e6:.3f} ms GPU per frame')
+            self.total_ns = 0
+            self.samples = 0
+        return elapsed_ns / 1e6
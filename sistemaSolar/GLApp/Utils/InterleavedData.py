@@ -0,0 +1,96 @@
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+# Formato anterior: vec3 posicion + vec3 color + vec3 normal + vec2 uv, todo en float32
+LEGACY_STRIDE = (3 + 3 + 3 + 2) * 4
+
+# formato -> (bytes, componentes, tipo GL, normalizado)
+NORMAL_FORMATS = {
+    "float": (12, 3, GL_FLOAT, False),
+    "short": (8, 3, GL_SHORT, True),  # 3 shorts + 2 bytes de relleno para alinear a 4
+    "int_2_10_10_10": (4, 4, GL_INT_2_10_10_10_REV, True),
+}
+UV_FORMATS = {
+    "float": (8, 2, GL_FLOAT, False),
+    "half": (4, 2, GL_HALF_FLOAT, False),
+    "ushort": (4, 2, GL_UNSIGNED_SHORT, True),  # solo uvs dentro de [0, 1]
+}
+
+
+def vertex_stride(layout):
+    return 12 + NORMAL_FORMATS[layout["normal"]][0] + UV_FORMATS[layout["uv"]][0]
+
+
+def pack_int_2_10_10_10(normals):
+    n = np.clip(np.asarray(normals, np.float32)[:, :3], -1, 1)
+    q = (np.round(n * 511).astype(np.int32) & 0x3FF).astype(np.uint32)
+    return q[:, 0] | (q[:, 1] << 10) | (q[:, 2] << 20)
+
+
+def pack_vertices(layout, positions, normals, uvs):
+    positions = np.asarray(positions, np.float32).reshape(-1, 3)
+    normals = np.asarray(normals, np.float32).reshape(-1, 3)
+    uvs = np.asarray(uvs, np.float32)[:, :2] if len(uvs) > 0 else np.zeros((0, 2), np.float32)
+    normal_format, uv_format = layout["normal"], layout["uv"]
+    if uv_format == "ushort" and (uvs.min(initial=0) < 0 or uvs.max(initial=0) > 1):
+        print("uvs outside [0, 1], using half floats instead of normalized shorts")
+        uv_format = "half"
+
+    normal_size = NORMAL_FORMATS[normal_format][0]
+    uv_size = UV_FORMATS[uv_format][0]
+    stride = 12 + normal_size + uv_size
+    data = np.zeros((len(positions), stride), np.uint8)
+    data[:, 0:12] = positions.view(np.uint8).reshape(-1, 12)
+
+    if normal_format == "float":
+        packed_normals = normals
+    elif normal_format == "short":
+        packed_normals = np.zeros((len(normals), 4), np.int16)
+        packed_normals[:, :3] = np.round(np.clip(normals, -1, 1) * 32767)
+    else:
+        packed_normals = pack_int_2_10_10_10(normals)
+    data[:, 12:12 + normal_size] = np.ascontiguousarray(packed_normals).view(np.uint8).reshape(-1, normal_size)
+
+    if uv_format == "float":
+        packed_uvs = uvs
+    elif uv_format == "half":
+        packed_uvs = uvs.astype(np.float16)
+    else:
+        packed_uvs = np.round(np.clip(uvs, 0, 1) * 65535).astype(np.uint16)
+    data[:, 12 + normal_size:] = np.ascontiguousarray(packed_uvs).view(np.uint8).reshape(-1, uv_size)
+
+    attributes = [
+        ("position", 3, GL_FLOAT, False, 0),
+        ("vertexNormal",) + NORMAL_FORMATS[normal_format][1:] + (12,),
+        ("vertexUv",) + UV_FORMATS[uv_format][1:] + (12 + normal_size,),
+    ]
+    return data, stride, attributes
+
+
+class InterleavedData:
+    def __init__(self, layout, positions, normals, uvs):
+        self.data, self.stride, self.attributes = pack_vertices(layout, positions, normals, uvs)
+        self.size_bytes = self.data.nbytes
+        self.buffer_ref = glGenBuffers(1)
+        self.load()
+
+    def load(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer_ref)
+        glBufferData(GL_ARRAY_BUFFER, self.data.ravel(), GL_STATIC_DRAW)
+
+    def create_variables(self, program_id):
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer_ref)
+        for variable_name, size, gl_type, normalized, offset in self.attributes:
+            variable_id = glGetAttribLocation(program_id, variable_name)
+            if variable_id < 0:
+                continue
+            glVertexAttribPointer(variable_id, size, gl_type, normalized, self.stride, ctypes.c_void_p(offset))
+            glEnableVertexAttribArray(variable_id)
+
+    def delete(self):
+        if self.buffer_ref is not None:
+            glDeleteBuffers(1, [self.buffer_ref])
+            self.buffer_ref = None
+            self.size_bytes = 0
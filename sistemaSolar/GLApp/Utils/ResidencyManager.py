@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+import numpy as np
+
+GEOMETRY = "geometry"
+TEXTURE = "texture"
+
+
+# Decide que mallas y texturas viven en la GPU segun su tamaño en pantalla. Cada cuerpo pide
+# residencia al dibujarse; los que llevan mas tiempo sin pedirla se expulsan (LRU) cuando la
+# memoria supera el presupuesto. El tamaño se mide desde el punto de vista mas cercano (camara o nave).
+class ResidencyManager:
+    def __init__(self, budget_bytes, geometry_threshold, texture_threshold, max_upload_bytes_per_frame=None):
+        self.budget_bytes = budget_bytes
+        # Umbrales en radio angular (radianes) a partir de los cuales se carga cada recurso
+        self.geometry_threshold = geometry_threshold
+        self.texture_threshold = texture_threshold
+        # Bytes de textura que se pueden subir en un frame (None = sin limite); siempre se permite al
+        # menos una subida por frame para que una textura mas grande que el limite termine cargandose.
+        # La geometria no tiene limite ni respaldo: un cuerpo visible sin malla desapareceria, asi que
+        # se sube siempre, aunque supere el presupuesto hasta que se pueda expulsar algo
+        self.max_upload_bytes_per_frame = max_upload_bytes_per_frame
+        self.viewpoints = np.zeros((1, 3), np.float32)
+        self.frame = 0
+        self.uploaded_bytes = 0
+        self.resident_bytes = 0
+        # (malla, tipo) -> ultimo frame en que se pidio, ordenado de menos a mas reciente
+        self.entries = OrderedDict()
+        self.sizes = {}
+
+    def begin_frame(self, *viewpoints):
+        self.viewpoints = np.array([np.asarray(point, np.float32)[:3] for point in viewpoints], np.float32)
+        self.frame += 1
+        self.uploaded_bytes = 0
+
+    def touch(self, mesh, transformation):
+        position = np.asarray(transformation, np.float32)[:3, 3]
+        radius = mesh.bounding_radius * np.linalg.norm(np.asarray(transformation, np.float32)[:3, 0])
+        distance = max(float(np.min(np.linalg.norm(self.viewpoints - position, axis=1))), 1e-6)
+        angular_radius = radius / distance
+        if angular_radius >= self.geometry_threshold:
+            self.request(mesh, GEOMETRY)
+        if angular_radius >= self.texture_threshold:
+            self.request(mesh, TEXTURE)
+        return angular_radius
+
+    def request(self, mesh, kind):
+        key = (mesh, kind)
+        if key in self.entries:
+            self.entries[key] = self.frame
+            self.entries.move_to_end(key)
+            return
+        size = self.size_of(mesh, kind)
+        if kind == TEXTURE:
+            # Mientras tanto la malla se dibuja con el color medio de la textura
+            if (self.max_upload_bytes_per_frame is not None and self.uploaded_bytes > 0
+                    and self.uploaded_bytes + size > self.max_upload_bytes_per_frame):
+                return
+            if not self.make_room(size):
+                return
+        else:
+            self.make_room(size)
+        if kind == GEOMETRY:
+            mesh.load_geometry()
+        else:
+            mesh.image.load()
+        self.uploaded_bytes += size
+        self.sizes[key] = self.size_of(mesh, kind)
+        self.resident_bytes += self.sizes[key]
+        self.entries[key] = self.frame
+
+    def make_room(self, size):
+        if size > self.budget_bytes:
+            return False
+        for key in list(self.entries):
+            if self.resident_bytes + size <= self.budget_bytes:
+                break
+            if self.entries[key] == self.frame:
+                # Lo que ya se uso en este frame no se expulsa
+                continue
+            self.evict(key)
+        return self.resident_bytes + size <= self.budget_bytes
+
+    def evict(self, key):
+        mesh, kind = key
+        self.resident_bytes -= self.sizes.pop(key)
+        if kind == GEOMETRY:
+            mesh.unload_geometry()
+        else:
+            mesh.image.unload()
+        del self.entries[key]
+
+    def evict_all(self):
+        for key in list(self.entries):
+            self.evict(key)
+
+    @staticmethod
+    def size_of(mesh, kind):
+        return mesh.geometry_bytes if kind == GEOMETRY else mesh.image.size_bytes
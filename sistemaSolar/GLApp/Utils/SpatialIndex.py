@@ -0,0 +1,234 @@
+import sys
+import time
+
+import numpy as np
+
+
+def morton_codes(points, bits=10):
+    # Intercala los bits de x, y, z cuantizados para ordenar los cuerpos por cercania espacial
+    low = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - low, 1e-9)
+    cells = ((points - low) / extent * ((1 << bits) - 1)).astype(np.uint64)
+    codes = np.zeros(len(points), np.uint64)
+    for bit in range(bits):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + axis)
+    return codes
+
+
+def ray_sphere(origin, direction, centers, radii):
+    # Distancia a lo largo del rayo (direccion normalizada) a cada esfera, inf si no hay impacto
+    offset = centers - origin
+    along = offset @ direction
+    closest = np.einsum('ij,ij->i', offset, offset) - along * along
+    half_chord = radii * radii - closest
+    hit = half_chord >= 0
+    t = np.full(len(centers), np.inf)
+    root = np.sqrt(np.where(hit, half_chord, 0))
+    near = along - root
+    far = along + root
+    t[hit] = np.where(near[hit] >= 0, near[hit], far[hit])
+    t[t < 0] = np.inf
+    return t
+
+
+class SpatialIndex:
+    # BVH de dos niveles: los cuerpos se ordenan por codigo Morton y se agrupan en hojas de tamaño
+    # fijo con su AABB. Las consultas prueban todas las hojas de forma vectorizada y luego solo los
+    # cuerpos de las hojas que pasan. Con hojas de ~sqrt(n) cuerpos cada consulta cuesta O(sqrt(n))
+    def __init__(self, leaf_size=None, rebuild_factor=2.0):
+        self.leaf_size = leaf_size
+        # refit reconstruye cuando el area de las hojas supera rebuild_factor veces la del ultimo build
+        self.rebuild_factor = rebuild_factor
+        self.build_area = 0.0
+        self.rebuilds = 0
+        self.order = np.zeros(0, np.int64)
+        self.centers = np.zeros((0, 3))
+        self.radii = np.zeros(0)
+        self.leaf_starts = np.zeros(0, np.int64)
+        self.leaf_min = np.zeros((0, 3))
+        self.leaf_max = np.zeros((0, 3))
+
+    def __len__(self):
+        return len(self.order)
+
+    def build(self, centers, radii):
+        centers = np.asarray(centers, np.float64).reshape(-1, 3)
+        self.order = np.argsort(morton_codes(centers)) if len(centers) > 0 else np.zeros(0, np.int64)
+        leaf_size = self.leaf_size or max(64, int(np.sqrt(len(centers))))
+        self.leaf_starts = np.arange(0, len(centers), leaf_size)
+        self.fit(centers, np.broadcast_to(np.asarray(radii, np.float64), (len(centers),)))
+        self.build_area = self.leaf_area()
+        self.rebuilds += 1
+
+    def refit(self, centers, radii):
+        # Mismo orden y mismas hojas, solo se recalculan las cajas: suficiente mientras los cuerpos
+        # se mueven poco. Si el orden Morton deja de agrupar bien, las cajas crecen y se reconstruye
+        centers = np.asarray(centers, np.float64).reshape(-1, 3)
+        radii = np.broadcast_to(np.asarray(radii, np.float64), (len(centers),))
+        if len(centers) != len(self.order):
+            self.build(centers, radii)
+            return
+        self.fit(centers, radii)
+        if self.build_area > 0 and self.leaf_area() > self.build_area * self.rebuild_factor:
+            self.build(centers, radii)
+
+    def leaf_area(self):
+        # Suma de las superficies de las cajas: estima cuantas hojas atraviesa una consulta
+        extent = self.leaf_max - self.leaf_min
+        return float(np.sum(extent[:, 0] * extent[:, 1] + extent[:, 1] * extent[:, 2] + extent[:, 2] * extent[:, 0]))
+
+    def fit(self, centers, radii):
+        self.centers = centers[self.order]
+        self.radii = radii[self.order]
+        if len(centers) == 0:
+            self.leaf_min = np.zeros((0, 3))
+            self.leaf_max = np.zeros((0, 3))
+            return
+        self.leaf_min = np.minimum.reduceat(self.centers - self.radii[:, None], self.leaf_starts)
+        self.leaf_max = np.maximum.reduceat(self.centers + self.radii[:, None], self.leaf_starts)
+
+    def leaf_bodies(self, leaves):
+        if len(leaves) == 0:
+            return np.zeros(0, np.int64)
+        ends = np.append(self.leaf_starts[1:], len(self.order))
+        return np.concatenate([np.arange(self.leaf_starts[leaf], ends[leaf]) for leaf in leaves])
+
+    def ray_cast(self, origin, direction, max_distance=np.inf):
+        # Devuelve (indice del cuerpo, distancia) del primer impacto o (-1, inf)
+        origin = np.asarray(origin, np.float64)
+        direction = np.asarray(direction, np.float64)
+        direction = direction / np.linalg.norm(direction)
+        if len(self.order) == 0:
+            return -1, np.inf
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse = 1.0 / direction
+            t0 = (self.leaf_min - origin) * inverse
+            t1 = (self.leaf_max - origin) * inverse
+        t_near = np.nanmax(np.minimum(t0, t1), axis=1)
+        t_far = np.nanmin(np.maximum(t0, t1), axis=1)
+        leaves = np.nonzero((t_near <= t_far) & (t_far >= 0) & (t_near <= max_distance))[0]
+        best, best_t = -1, max_distance
+        # Hojas en orden de entrada: se para en cuanto la siguiente empieza despues del mejor impacto
+        for leaf in leaves[np.argsort(t_near[leaves])]:
+            if t_near[leaf] > best_t:
+                break
+            candidates = self.leaf_bodies([leaf])
+            t = ray_sphere(origin, direction, self.centers[candidates], self.radii[candidates])
+            hit = int(np.argmin(t))
+            if t[hit] < best_t:
+                best, best_t = int(self.order[candidates[hit]]), float(t[hit])
+        return (best, best_t) if best >= 0 else (-1, np.inf)
+
+    def k_nearest(self, point, k=1):
+        # Devuelve (indices, distancias) de los k cuerpos cuyo centro esta mas cerca de point
+        point = np.asarray(point, np.float64)
+        k = min(k, len(self.order))
+        if k == 0:
+            return np.zeros(0, np.int64), np.zeros(0)
+        leaf_distance = np.linalg.norm(np.maximum(np.maximum(self.leaf_min - point, point - self.leaf_max), 0), axis=1)
+        leaf_order = np.argsort(leaf_distance)
+        found = np.zeros(0, np.int64)
+        found_distance = np.zeros(0)
+        taken = 0
+        while taken < len(leaf_order):
+            # Se añaden hojas por tandas hasta que la siguiente no puede mejorar el k-esimo
+            batch = leaf_order[taken:taken + max(1, taken)]
+            taken += len(batch)
+            candidates = self.leaf_bodies(batch)
+            found = np.concatenate([found, candidates])
+            found_distance = np.concatenate([found_distance, np.linalg.norm(self.centers[candidates] - point, axis=1)])
+            if len(found) >= k:
+                keep = np.argpartition(found_distance, k - 1)[:k]
+                found, found_distance = found[keep], found_distance[keep]
+                if taken >= len(leaf_order) or leaf_distance[leaf_order[taken]] > found_distance.max():
+                    break
+        by_distance = np.argsort(found_distance)
+        return self.order[found[by_distance]], found_distance[by_distance]
+
+    def sphere_overlap(self, center, radius):
+        # Indices de los cuerpos cuya esfera toca la esfera (center, radius)
+        center = np.asarray(center, np.float64)
+        if len(self.order) == 0:
+            return np.zeros(0, np.int64)
+        leaf_distance = np.linalg.norm(np.maximum(np.maximum(self.leaf_min - center, center - self.leaf_max), 0), axis=1)
+        candidates = self.leaf_bodies(np.nonzero(leaf_distance <= radius)[0])
+        distance = np.linalg.norm(self.centers[candidates] - center, axis=1)
+        return np.sort(self.order[candidates[distance <= radius + self.radii[candidates]]])
+
+
+def brute_ray_cast(centers, radii, origin, direction):
+    direction = np.asarray(direction, np.float64) / np.linalg.norm(direction)
+    t = ray_sphere(np.asarray(origin, np.float64), direction, centers, radii)
+    hit = int(np.argmin(t))
+    return (hit, float(t[hit])) if np.isfinite(t[hit]) else (-1, np.inf)
+
+
+def brute_k_nearest(centers, point, k=1):
+    distance = np.linalg.norm(centers - point, axis=1)
+    nearest = np.argsort(distance)[:k]
+    return nearest, distance[nearest]
+
+
+def brute_sphere_overlap(centers, radii, center, radius):
+    return np.nonzero(np.linalg.norm(centers - center, axis=1) <= radius + radii)[0]
+
+
+def same_ray_hit(indexed, brute):
+    return indexed[0] == brute[0] or np.isclose(indexed[1], brute[1])
+
+
+def same_k_nearest(indexed, brute):
+    # Con empates el orden puede variar: basta con que las distancias coincidan
+    return np.allclose(indexed[1], brute[1])
+
+
+def same_overlap(indexed, brute):
+    return np.array_equal(indexed, brute)
+
+
+def benchmark(counts=(100, 10_000, 1_000_000), queries=50, seed=0, drift=5.0):
+    # Devuelve el numero de consultas cuyo resultado no coincide con la fuerza bruta
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for count in counts:
+        # Disco delgado como el plano de las orbitas
+        centers = rng.uniform(-100, 100, (count, 3)) * [1, 0.05, 1]
+        radii = rng.uniform(0.01, 0.5, count) * (100 / np.cbrt(count))
+        index = SpatialIndex()
+        start = time.perf_counter()
+        index.build(centers, radii)
+        build_ms = (time.perf_counter() - start) * 1000
+        # Los cuerpos se desplazan despues del build para que las consultas pasen por refit
+        centers = centers + rng.normal(scale=drift, size=centers.shape) * [1, 0.05, 1]
+        start = time.perf_counter()
+        index.refit(centers, radii)
+        refit_ms = (time.perf_counter() - start) * 1000
+        origins = rng.uniform(-100, 100, (queries, 3)) * [1, 0.05, 1]
+        directions = rng.normal(size=(queries, 3))
+        print(f'{count} bodies: build {build_ms:.2f} ms, refit {refit_ms:.2f} ms '
+              f'({"rebuilt" if index.rebuilds > 1 else "kept leaves"})')
+        cases = [
+            ("ray_cast", lambda i: index.ray_cast(origins[i], directions[i]),
+             lambda i: brute_ray_cast(centers, radii, origins[i], directions[i]), same_ray_hit),
+            ("k_nearest", lambda i: index.k_nearest(origins[i], 8),
+             lambda i: brute_k_nearest(centers, origins[i], 8), same_k_nearest),
+            ("sphere_overlap", lambda i: index.sphere_overlap(origins[i], 5),
+             lambda i: brute_sphere_overlap(centers, radii, origins[i], 5), same_overlap),
+        ]
+        for name, indexed, brute, same in cases:
+            timings = []
+            results = []
+            for query in (indexed, brute):
+                start = time.perf_counter()
+                results.append([query(i) for i in range(queries)])
+                timings.append((time.perf_counter() - start) / queries * 1e6)
+            wrong = sum(not same(a, b) for a, b in zip(*results))
+            mismatches += wrong
+            print(f'  {name:15s} index {timings[0]:10.1f} us  brute force {timings[1]:10.1f} us  '
+                  f'x{timings[1] / timings[0]:.1f}  {"ok" if wrong == 0 else f"{wrong} MISMATCHES"}')
+    return mismatches
+
+
+if __name__ == '__main__':
+    sys.exit(1 if benchmark() else 0)
@@ -1,5 +1,13 @@
+import hashlib
+import os
+import struct
+import time
+
+import numpy as np
 from OpenGL.GL import *
 
+from sistemaSolar.config import shader_cache_dir
+
 
 def compile_shader(shader_type, shader_source):
     shader_id = glCreateShader(shader_type)
@@ -14,10 +22,63 @@ def compile_shader(shader_type, shader_source):
     return shader_id
 
 
-def create_program(vertex_shader_code, fragment_shader_code):
+def program_binary_supported():
+    try:
+        return glGetIntegerv(GL_NUM_PROGRAM_BINARY_FORMATS) > 0
+    except GLError:
+        return False
+
+
+def program_cache_key(vertex_shader_code, fragment_shader_code):
+    # El binario solo es valido para el mismo driver, por eso se incluye en la llave
+    key = hashlib.sha256()
+    for part in (vertex_shader_code, fragment_shader_code,
+                 glGetString(GL_VENDOR), glGetString(GL_RENDERER), glGetString(GL_VERSION)):
+        key.update(part if isinstance(part, bytes) else str(part).encode())
+        key.update(b'\0')
+    return key.hexdigest()
+
+
+def load_program_binary(cache_path):
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, 'rb') as f:
+        data = f.read()
+    if len(data) <= 4:
+        return None
+    binary_format = struct.unpack('<I', data[:4])[0]
+    binary = np.frombuffer(data[4:], np.uint8)
+    program_id = glCreateProgram()
+    glProgramBinary(program_id, binary_format, binary, len(binary))
+    if not glGetProgramiv(program_id, GL_LINK_STATUS):
+        # El driver rechazo el binario (actualizacion de driver, formato distinto...)
+        glDeleteProgram(program_id)
+        return None
+    return program_id
+
+
+def save_program_binary(program_id, cache_path):
+    size = glGetProgramiv(program_id, GL_PROGRAM_BINARY_LENGTH)
+    if size <= 0:
+        return
+    length = np.zeros(1, np.int32)
+    binary_format = np.zeros(1, np.uint32)
+    binary = np.zeros(size, np.uint8)
+    glGetProgramBinary(program_id, size, length, binary_format, binary)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack('<I', int(binary_format[0])))
+        f.write(binary[:int(length[0])].tobytes())
+    os.replace(tmp_path, cache_path)
+
+
+def link_program(vertex_shader_code, fragment_shader_code, retrievable=False):
     vertex_shader_id = compile_shader(GL_VERTEX_SHADER, vertex_shader_code)
     fragment_shader_id = compile_shader(GL_FRAGMENT_SHADER, fragment_shader_code)
     program_id = glCreateProgram()
+    if retrievable:
+        glProgramParameteri(program_id, GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL_TRUE)
     glAttachShader(program_id, vertex_shader_id)
     glAttachShader(program_id, fragment_shader_id)
     glLinkProgram(program_id)
@@ -27,3 +88,28 @@ def create_program(vertex_shader_code, fragment_shader_code):
         glDeleteShader(fragment_shader_id)
         raise RuntimeError(glGetProgramInfoLog(program_id))
     return program_id
+
+
+def create_program(vertex_shader_code, fragment_shader_code, cache_dir=shader_cache_dir):
+    start = time.perf_counter()
+    if cache_dir is None or not program_binary_supported():
+        program_id = link_program(vertex_shader_code, fragment_shader_code)
+        print(f'Shader program linked from source in {(time.perf_counter() - start) * 1000:.1f} ms')
+        return program_id
+
+    cache_path = os.path.join(cache_dir, program_cache_key(vertex_shader_code, fragment_shader_code) + '.bin')
+    try:
+        program_id = load_program_binary(cache_path)
+    except (GLError, OSError):
+        program_id = None
+    if program_id is not None:
+        print(f'Shader cache hit ({cache_path}) in {(time.perf_counter() - start) * 1000:.1f} ms')
+        return program_id
+
+    program_id = link_program(vertex_shader_code, fragment_shader_code, retrievable=True)
+    print(f'Shader cache miss, linked from source in {(time.perf_counter() - start) * 1000:.1f} ms')
+    try:
+        save_program_binary(program_id, cache_path)
+    except (GLError, OSError) as e:
+        print(f'Could not store shader binary: {e}')
+    return program_id
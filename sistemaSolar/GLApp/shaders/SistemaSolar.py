@@ -1,21 +1,37 @@
 # Importaciones y configuración inicial
+import argparse
+import time
+
 import numpy as np
 import pygame
 from OpenGL.GL import *
 from sistemaSolar.GLApp.BaseApps.BaseScene import BaseScene
+from sistemaSolar.GLApp.BaseApps.DynamicResolution import DynamicResolution
 from sistemaSolar.GLApp.Camera.Camera import Camera
+from sistemaSolar.GLApp.Camera.CameraTrace import CameraRecorder, load_trace, frame_time_summary, save_frame_times
 
 from sistemaSolar.GLApp.Mesh.Light.ObjTextureMesh import ObjTextureMesh
-from sistemaSolar.GLApp.Transformations.Transformations import identity_mat, scale, translate, rotate
+from sistemaSolar.GLApp.Mesh.Skybox import Skybox
+from sistemaSolar.GLApp.Transformations.Orbits import planet_transform, satellite_transform
+from sistemaSolar.GLApp.Transformations.Transformations import identity_mat, scale
+from sistemaSolar.GLApp.Utils.GpuTimer import GpuTimer
+from sistemaSolar.GLApp.Utils.ResidencyManager import ResidencyManager
+from sistemaSolar.GLApp.Utils.SpatialIndex import SpatialIndex
 from sistemaSolar.GLApp.Utils.Utils import create_program
-from sistemaSolar.config import get_orbit_paused,set_orbit_paused
+from sistemaSolar.config import get_orbit_paused, set_orbit_paused, gpu_memory_budget, \
+    residency_upload_bytes_per_frame, residency_geometry_threshold, residency_texture_threshold, planet_lod_ratios, \
+    skybox_pass, profile_background, dynamic_resolution, frame_time_target_ms, resolution_scale_range, msaa_levels
+
+# Avance de las orbitas y de la rotacion propia por milisegundo de simulacion; equivalen a los
+# incrementos fijos por frame de antes (0.00001 y 0.1 grados) a 60 fps
+ORBIT_VALOR_PER_MS = 0.00001 * 60 / 1000
+AXIAL_DEGREES_PER_MS = 0.1 * 60 / 1000
 
 # Actualización del shader para usar la posición del sol
 vertex_shader = r'''
 #version 330 core
 
 in vec3 position;
-in vec3 vertexColor;
 in vec3 vertexNormal;
 in vec2 vertexUv;
 
@@ -23,6 +39,7 @@ uniform mat4 projectionMatrix;
 uniform mat4 modelMatrix;
 uniform mat4 viewMatrix;
 uniform vec3 sunPosition; // Posición del sol como variable uniforme
+uniform vec3 meshColor;
 
 out vec3 color;
 out vec3 normal;
@@ -37,7 +54,7 @@ void main()
     gl_Position = projectionMatrix * inverse(viewMatrix) * modelMatrix * vec4(position, 1);
     normal = mat3(transpose(inverse(modelMatrix))) * vertexNormal;
     fragPos = vec3(modelMatrix * vec4(position, 1));
-    color = vertexColor;
+    color = meshColor;
     uv = vertexUv;
 }
 '''
@@ -85,13 +102,32 @@ void main(){
 
 class VertexShaderCameraDemo(BaseScene):
 
-    def __init__(self):
-        super().__init__(1600, 800)
+    def __init__(self, hidden=False, offline=False):
+        # Con resolucion dinamica o en modo offline se renderiza a un framebuffer propio con su MSAA
+        super().__init__(1600, 800, hidden, 0 if dynamic_resolution or offline else 4)
+        self.offline = offline
         self.ship = None
         self.stars = None
+        self.skybox = None
+        self.background_timer = None
+        # Nombre, centro y radio de cada cuerpo dibujado en el frame, para las consultas espaciales
+        self.spatial_index = SpatialIndex()
+        self.body_names = []
+        self.body_centers = []
+        self.body_radii = []
+        self.frame_body_names = []
         self.program_id = None
         self.planets = {}
         self.valor = 0.0
+        self.last_ticks = None
+        # En modo offline el reloj de la simulacion lo fija el renderizador (ms), no pygame
+        self.sim_ticks = None
+        self.interactive = True
+        self.recorder = None
+        self.trace = None
+        self.trace_frame = 0
+        self.residency = ResidencyManager(gpu_memory_budget, residency_geometry_threshold,
+                                          residency_texture_threshold, residency_upload_bytes_per_frame)
 
 
 
@@ -100,8 +136,22 @@ class VertexShaderCameraDemo(BaseScene):
         self.program_id = create_program(vertex_shader, fragment_shader)
         self.initialize_planets()
         self.camera = Camera(self.program_id, self.screen.get_width(), self.screen.get_height())
+        if dynamic_resolution and not self.offline:
+            self.resolution = DynamicResolution(self.screen.get_width(), self.screen.get_height(), frame_time_target_ms,
+                                                *resolution_scale_range, msaa_levels)
+        if profile_background:
+            self.background_timer = GpuTimer("Skybox pass" if skybox_pass else "Lit star sphere")
+        if self.offline:
+            # Un video no puede mostrar cuerpos a medio cargar: todo lo visible se sube en el primer frame
+            self.residency.max_upload_bytes_per_frame = None
         glEnable(GL_DEPTH_TEST)
 
+    def reset_simulation(self):
+        self.valor = 0.0
+        self.last_ticks = None
+        for planet in self.planets.values():
+            planet.rotation_angles = planet.initial_rotation_angle
+
     def initialize_planets(self):
         planets_data = {
             "sun": {"scale": 0.5, "texture_path": "../../assets/textures/sol.jpg", "orbit_radius": 0, "rotation_speeds_self": 0, "rotation_angles": 0, "rotation_speeds_sun": 0},
@@ -312,96 +362,192 @@ class VertexShaderCameraDemo(BaseScene):
             self.planets[planet_name] = ObjTextureMesh(
                 self.program_id,
                 "../../assets/models/modeloPlaneta.obj",
-                data["texture_path"]
+                data["texture_path"],
+                self.residency,
+                lod_ratios=planet_lod_ratios
             )
             self.planets[planet_name].orbit_radius = data["orbit_radius"]
             self.planets[planet_name].scale = data["scale"]
             self.planets[planet_name].rotation_speeds_self = data["rotation_speeds_self"]
             self.planets[planet_name].rotation_angles = data["rotation_angles"]
+            self.planets[planet_name].initial_rotation_angle = data["rotation_angles"]
             self.planets[planet_name].rotation_speeds_sun = data["rotation_speeds_sun"]
             self.planets[planet_name].satellites = []
+            self.planets[planet_name].name = planet_name
 
             for sat_data in data.get("satellites", []):
                 satellite = ObjTextureMesh(self.program_id, "../../assets/models/modeloPlaneta.obj",
-                                           sat_data["texture_path"])
+                                           sat_data["texture_path"], self.residency, lod_ratios=planet_lod_ratios)
                 satellite.orbit_radius = sat_data["orbit_radius"]
                 satellite.scale = sat_data["scale"]
                 satellite.rotation_speeds_self = sat_data["rotation_speeds_self"]
                 satellite.rotation_angles = sat_data["rotation_angles"]
+                satellite.name = sat_data["name"]
                 self.planets[planet_name].satellites.append(satellite)
             #self.planets[planet_name] = planet
 
         # estrellas
-        self.stars = ObjTextureMesh(
-            self.program_id,
-            "../../assets/models/modeloPlaneta.obj",
-            "../../assets/textures/estrellas.jpg"
-        )
+        if skybox_pass:
+            self.skybox = Skybox("../../assets/models/modeloPlaneta.obj", "../../assets/textures/estrellas.jpg")
+        else:
+            self.stars = ObjTextureMesh(
+                self.program_id,
+                "../../assets/models/modeloPlaneta.obj",
+                "../../assets/textures/estrellas.jpg"
+            )
 
     def draw_planet(self, planet_name, transformation):
         planet = self.planets[planet_name]
+        self.add_body(planet, transformation)
         planet.draw(transformation)
         for satellite in planet.satellites:
             self.draw_satellite(transformation, satellite)
 
-    def draw_satellite(self, planet_transform, satellite):
-        # La rotación del satélite debe ser independiente de si los planetas están pausados
-        rotation_angle = (pygame.time.get_ticks() * satellite.rotation_speeds_self) % 360
-
-        x = satellite.orbit_radius * np.cos(np.radians(rotation_angle))
-        z = satellite.orbit_radius * np.sin(np.radians(rotation_angle))
-
-        transform = translate(identity_mat(), planet_transform[0][3] + x, planet_transform[1][3],
-                              planet_transform[2][3] + z)
-        transform = rotate(transform, satellite.rotation_angles, 'y')
-        transform = scale(transform, satellite.scale, satellite.scale, satellite.scale)
-
+    def apply_trace_frame(self, frame):
+        self.sim_ticks = float(frame['ticks'])
+        self.camera.transformation = np.array(frame['camera'], np.float32)
+        if get_orbit_paused() != bool(frame['paused']):
+            set_orbit_paused()
+
+    def record(self, path):
+        self.recorder = CameraRecorder(path)
+        self.main_loop()
+
+    def finish(self):
+        if self.recorder is not None:
+            self.recorder.save()
+        # Libera texturas y mallas de la GPU mientras el contexto sigue vivo
+        self.residency.evict_all()
+
+    def replay(self, path, frame_times_path=None, warmup_frames=10):
+        # Reproduce la traza frame a frame con la resolucion fija para que las corridas sean comparables.
+        # Los primeros frames (subidas a la GPU, compilacion de shaders) se renderizan sin cronometrar
+        self.trace = load_trace(path)
+        self.initialize()
+        if self.resolution is not None:
+            self.resolution.adaptive = False
+        for self.trace_frame in range(min(warmup_frames, len(self.trace))):
+            pygame.event.pump()
+            self.render_frame()
+        glFinish()
+        self.reset_simulation()
+        frame_ms = []
+        for self.trace_frame in range(len(self.trace)):
+            pygame.event.pump()
+            # Se cronometra hasta que la GPU termina, sin el flip: con vsync este fija el frame en ~16.7 ms
+            start = time.perf_counter()
+            self.draw_frame()
+            glFinish()
+            frame_ms.append((time.perf_counter() - start) * 1000)
+            pygame.display.flip()
+        summary = frame_time_summary(frame_ms)
+        print(f"Replayed {summary['frames']} frames after {warmup_frames} warm-up frames: mean {summary['mean_ms']:.2f} ms, "
+              f"p50 {summary['p50_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms")
+        if frame_times_path is not None:
+            save_frame_times(frame_times_path, frame_ms)
+        self.finish()
+        pygame.quit()
+        return frame_ms
+
+    def ticks(self):
+        return pygame.time.get_ticks() if self.sim_ticks is None else self.sim_ticks
+
+    def draw_satellite(self, planet_transformation, satellite):
+        transform = satellite_transform(planet_transformation, satellite.orbit_radius, satellite.rotation_speeds_self,
+                                        self.ticks(), satellite.rotation_angles, satellite.scale)
+
+        self.add_body(satellite, transform)
         satellite.draw(transform)
 
+    def add_body(self, mesh, transformation):
+        self.body_names.append(mesh.name)
+        self.body_centers.append(transformation[:3, 3])
+        self.body_radii.append(mesh.bounding_radius * mesh.scale)
+
+    def update_spatial_index(self):
+        self.spatial_index.refit(np.array(self.body_centers, np.float64).reshape(-1, 3), np.array(self.body_radii))
+        self.frame_body_names = self.body_names
+        self.body_names = []
+        self.body_centers = []
+        self.body_radii = []
+
+    def body_under_cursor(self, mouse_pos=None):
+        # Rayo desde la camara a traves del pixel (con el raton capturado, el centro de la pantalla)
+        x, y = mouse_pos if mouse_pos is not None else pygame.mouse.get_pos()
+        ndc = np.array([2 * x / self.camera.screen_width - 1, 1 - 2 * y / self.camera.screen_height, 1, 1])
+        far_point = np.linalg.inv(self.camera.get_projection_matrix()) @ ndc
+        camera_matrix = self.camera.get_view_matrix()
+        direction = camera_matrix[:3, :3] @ (far_point[:3] / far_point[3])
+        index, distance = self.spatial_index.ray_cast(camera_matrix[:3, 3], direction)
+        return (self.frame_body_names[index], distance) if index >= 0 else (None, np.inf)
+
+    def nearest_bodies_to_ship(self, k=1):
+        indices, distances = self.spatial_index.k_nearest(self.camera.character.position, k)
+        return [(self.frame_body_names[i], d) for i, d in zip(indices, distances)]
+
+    def ship_collisions(self):
+        character = self.camera.character
+        return [self.frame_body_names[i] for i in self.spatial_index.sphere_overlap(character.position, character.radius)]
+
     def display(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glUseProgram(self.program_id)
-        self.camera.update()
-
+        if self.trace is not None:
+            self.apply_trace_frame(self.trace[self.trace_frame])
+            self.camera.apply()
+        elif self.interactive:
+            self.camera.update()
+        else:
+            self.camera.apply()
+        if self.recorder is not None:
+            self.recorder.record(self.ticks(), self.camera.transformation, get_orbit_paused(), self.last_frame_ms)
+        self.residency.begin_frame(self.camera.transformation[:3, 3], self.camera.character.position)
+
+        # La simulacion avanza con el reloj (pygame u offline), no con el numero de frames
+        ticks = self.ticks()
+        elapsed_ms = ticks - self.last_ticks if self.last_ticks is not None else 0
+        self.last_ticks = ticks
         if get_orbit_paused() == False:
-            self.valor += 0.00001  # Incrementar solo si no está pausada la rotación
+            self.valor += ORBIT_VALOR_PER_MS * elapsed_ms  # Incrementar solo si no está pausada la rotación
 
         sun_position = np.array([0, 0, 0])
         sun_pos_location = glGetUniformLocation(self.program_id, 'sunPosition')
         glUniform3f(sun_pos_location, *sun_position)
 
         for planet_name, planet_data in self.planets.items():
-            orbit_radius = planet_data.orbit_radius
-            orbital_speed = planet_data.rotation_speeds_sun
-            angular_speed = 2 * np.pi / orbital_speed if orbital_speed != 0 else 0
-
-            #if get_orbit_paused() == False:
-            angular_position = (self.valor * angular_speed) % (2 * np.pi)
-            # else:
-                #angular_position = 0  # No cambiar la posición si está pausado
-
-            x = orbit_radius * np.cos(angular_position)
-            y = 0
-            z = orbit_radius * np.sin(angular_position)
-
-            transformation = identity_mat()
-            transformation = translate(transformation, x, y, z)
-
             if get_orbit_paused() == False:
-                planet_data.rotation_angles = (planet_data.rotation_angles + 0.1) % 360
-            axial_rotation_angle = planet_data.rotation_angles
-            transformation = rotate(transformation, axial_rotation_angle, 'y')
-
-            scale_factor = planet_data.scale
-            transformation = scale(transformation, scale_factor, scale_factor, scale_factor)
+                planet_data.rotation_angles = (planet_data.rotation_angles + AXIAL_DEGREES_PER_MS * elapsed_ms) % 360
+            transformation = planet_transform(planet_data.orbit_radius, planet_data.rotation_speeds_sun, self.valor,
+                                              planet_data.rotation_angles, planet_data.scale)
 
             self.draw_planet(planet_name, transformation)
+        self.update_spatial_index()
 
-        # Dibuja estrellas
-        transformation_stars = identity_mat()
-        transformation_stars = scale(transformation_stars, 100, 100, 100)
-        self.stars.draw(transformation_stars)
+        # Dibuja estrellas, siempre al final para que el early-z descarte lo ya cubierto
+        if self.background_timer is not None:
+            self.background_timer.begin()
+        if self.skybox is not None:
+            self.skybox.draw(self.camera.get_projection_matrix(), self.camera.get_view_matrix())
+        else:
+            transformation_stars = identity_mat()
+            transformation_stars = scale(transformation_stars, 100, 100, 100)
+            self.stars.draw(transformation_stars)
+        if self.background_timer is not None:
+            self.background_timer.end()
 
 
 if __name__ == '__main__':
-    VertexShaderCameraDemo().main_loop()
+    parser = argparse.ArgumentParser(description="Solar system viewer")
+    parser.add_argument("--record", metavar="TRACE", help="record the camera path to a binary trace")
+    parser.add_argument("--replay", metavar="TRACE", help="replay a recorded trace and report frame times")
+    parser.add_argument("--frame-times", metavar="JSON", help="where to store replay frame times")
+    parser.add_argument("--hidden", action="store_true", help="replay without showing the window")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed frames rendered before the replay")
+    args = parser.parse_args()
+
+    if args.replay:
+        VertexShaderCameraDemo(hidden=args.hidden).replay(args.replay, args.frame_times, args.warmup)
+    elif args.record:
+        VertexShaderCameraDemo().record(args.record)
+    else:
+        VertexShaderCameraDemo().main_loop()
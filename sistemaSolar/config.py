@@ -1,5 +1,42 @@
+import os
+
 orbit_paused = False
 
+# Directorio donde se guardan los binarios de los shaders ya enlazados (None lo desactiva)
+shader_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.shader_cache')
+# Directorio de las mallas ya optimizadas (None lo desactiva)
+mesh_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mesh_cache')
+
+# Presupuesto de memoria de GPU para mallas y texturas de los cuerpos
+gpu_memory_budget = 256 * 1024 * 1024
+# Bytes de textura que se suben como mucho por frame, para repartir las cargas y evitar tirones (la
+# geometria de lo visible siempre se sube)
+residency_upload_bytes_per_frame = 16 * 1024 * 1024
+# Radio angular (radianes) desde el que se sube la malla / la textura completa de un cuerpo
+residency_geometry_threshold = 0.0005
+residency_texture_threshold = 0.01
+
+# Formato del buffer de vertices intercalado: normal en "float", "short" o "int_2_10_10_10";
+# uv en "float", "half" o "ushort". Las posiciones siempre van en float32
+vertex_layout = {"normal": "int_2_10_10_10", "uv": "half"}
+
+# LODs simplificados por colapso de aristas (fraccion de triangulos) y radio angular (radianes)
+# por debajo del cual se dibuja cada uno
+mesh_lod_ratios = ()
+planet_lod_ratios = (0.5, 0.25)
+mesh_lod_thresholds = (0.02, 0.005)
+
+# Fondo de estrellas en un pase propio sin iluminacion (False usa la esfera iluminada de antes)
+skybox_pass = True
+# Imprime el tiempo de GPU del fondo cada cierto numero de frames
+profile_background = False
+
+# Resolucion dinamica: la escala de render y el MSAA se ajustan para mantener este tiempo de frame
+dynamic_resolution = True
+frame_time_target_ms = 1000 / 60
+resolution_scale_range = (0.5, 1.0)
+msaa_levels = (4, 2, 0)
+
 # Función para obtener el estado de 'orbit_paused'
 def get_orbit_paused():
     global orbit_paused
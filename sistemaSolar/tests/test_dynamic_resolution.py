@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+from sistemaSolar.GLApp.BaseApps import DynamicResolution as dynamic_resolution
+
+
+class FakeTimer:
+    def __init__(self, name, report_every=120, latency=4):
+        self.latency = latency
+
+
+class DynamicResolutionTest(unittest.TestCase):
+    # Se prueba solo la logica del controlador: sin contexto GL, los framebuffers y el temporizador
+    # se sustituyen
+    def setUp(self):
+        patches = [
+            mock.patch.object(dynamic_resolution, 'GpuTimer', FakeTimer),
+            mock.patch.object(dynamic_resolution, 'glGetIntegerv', return_value=8),
+            mock.patch.object(dynamic_resolution.DynamicResolution, 'create_framebuffers'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.resolution = dynamic_resolution.DynamicResolution(800, 600, 16.0, cooldown_frames=5)
+
+    def feed(self, frame_ms, frames):
+        for _ in range(frames):
+            self.resolution.frame_finished(frame_ms)
+
+    def test_starts_at_full_quality(self):
+        self.assertEqual(self.resolution.samples, 4)
+        self.assertEqual(self.resolution.scale, 1.0)
+
+    def test_slow_frames_drop_msaa_then_scale(self):
+        with mock.patch.object(self.resolution, 'degrade', wraps=self.resolution.degrade) as degrade:
+            self.feed(30.0, 4 + 5)
+            degrade.assert_called_once()
+        self.assertEqual(self.resolution.samples, 2)
+        self.feed(30.0, 4 + 5)
+        self.feed(30.0, 4 + 5)
+        self.assertEqual(self.resolution.samples, 0)
+        self.assertAlmostEqual(self.resolution.scale, 0.9)
+
+    def test_fast_frames_restore_quality(self):
+        self.resolution.msaa_index = 2
+        self.resolution.scale = 0.8
+        with mock.patch.object(self.resolution, 'improve', wraps=self.resolution.improve) as improve:
+            self.feed(5.0, 4 + 5)
+            improve.assert_called_once()
+        self.assertAlmostEqual(self.resolution.scale, 0.9)
+        self.assertEqual(self.resolution.samples, 0)
+
+    def test_ignores_in_flight_queries_and_isolated_spikes(self):
+        # Las primeras latency muestras tras un cambio miden la configuracion anterior
+        self.feed(30.0, 4)
+        self.assertEqual(len(self.resolution.frame_samples), 0)
+        self.feed(16.0, 3)
+        self.feed(100.0, 2)
+        self.assertEqual(self.resolution.samples, 4)
+        self.assertEqual(len(self.resolution.frame_samples), 5)
+
+    def test_change_clears_samples(self):
+        self.feed(30.0, 4 + 5)
+        self.assertEqual(len(self.resolution.frame_samples), 0)
+        self.assertEqual(self.resolution.frames_since_change, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()